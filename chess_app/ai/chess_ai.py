@@ -2,9 +2,67 @@
 Chess AI implementation using python-chess with different difficulty levels.
 """
 
+import os
 import chess
+import chess.polyglot
 import random
-from typing import Optional, List
+import threading
+from typing import Hashable, Optional, List, Tuple
+
+
+def _mirror_ranks(table: tuple) -> tuple:
+    """
+    Flip a flattened piece-square table vertically so it can be indexed
+    directly with the squares of black pieces.
+    
+    Args:
+        table: Piece-square values made of consecutive 64-square blocks
+        
+    Returns:
+        tuple: Table with the ranks of every block reversed
+    """
+    return tuple(table[index ^ 56] for index in range(len(table)))
+
+
+def _add_piece_values(table: tuple, piece_values: dict) -> tuple:
+    """
+    Fold the material value of each piece into a flattened piece-square table.
+    
+    Args:
+        table: Piece-square values made of consecutive 64-square blocks, one
+            per piece type with an extra trailing king block
+        piece_values: Material value of each piece type
+        
+    Returns:
+        tuple: Table whose entries score both material and position
+    """
+    return tuple(value + piece_values[min(index // 64 + 1, chess.KING)]
+                 for index, value in enumerate(table))
+
+
+class _SearchCancelled(Exception):
+    """Raised inside a search once its cancel event has been set."""
+
+
+class _SearchFrame:
+    """State of a node on the explicit stack of the negamax search."""
+    
+    __slots__ = ('key', 'depth', 'alpha', 'beta', 'alpha_orig', 'beta_orig',
+                 'moves', 'index', 'value', 'best_move')
+    
+    def __init__(self, key, depth, alpha, beta, alpha_orig, beta_orig, moves):
+        """Create a frame for a node whose ordered moves are still to be searched."""
+        self.key = key
+        self.depth = depth
+        self.alpha = alpha
+        self.beta = beta
+        self.alpha_orig = alpha_orig
+        self.beta_orig = beta_orig
+        self.moves = moves
+        self.index = 0
+        self.value = float('-inf')
+        self.best_move = None
+
 
 class ChessAI:
     """
@@ -21,6 +79,18 @@ class ChessAI:
         chess.KING: 20000
     }
     
+    # Transposition table bound flags
+    TT_EXACT = 0
+    TT_LOWER = 1
+    TT_UPPER = 2
+    
+    # The transposition table is kept between moves, since scores do not
+    # depend on the root position; it is emptied once it grows past this
+    TT_MAX_ENTRIES = 200000
+    
+    # Half-width of the aspiration window used by iterative deepening
+    ASPIRATION_WINDOW = 50
+    
     # Piece-square tables for positional evaluation
     PAWN_TABLE = [
         0,  0,  0,  0,  0,  0,  0,  0,
@@ -99,6 +169,24 @@ class ChessAI:
         -50,-30,-30,-30,-30,-30,-30,-50
     ]
     
+    # All piece-square tables flattened into one sequence indexed by
+    # (piece_type - 1) * 64 + square; the endgame king table follows the
+    # middle game one at offset 6 * 64
+    PST = tuple(PAWN_TABLE + KNIGHT_TABLE + BISHOP_TABLE + ROOK_TABLE + QUEEN_TABLE +
+                KING_MIDDLE_GAME_TABLE + KING_END_GAME_TABLE)
+    
+    # The same tables from black's point of view, so evaluation needs no
+    # per-piece square_mirror call
+    PST_MIRRORED = _mirror_ranks(PST)
+    
+    # The same tables with the piece values folded in, so a single lookup
+    # per piece scores both material and position
+    PST_MATERIAL = _add_piece_values(PST, PIECE_VALUES)
+    PST_MATERIAL_MIRRORED = _mirror_ranks(PST_MATERIAL)
+    
+    # Polyglot opening book consulted by medium and hard difficulties
+    OPENING_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books", "human.bin")
+    
     def __init__(self, difficulty: str = "medium"):
         """
         Initialize the AI with a specific difficulty level.
@@ -106,6 +194,12 @@ class ChessAI:
         Args:
             difficulty: Difficulty level of the AI ("easy", "medium", "hard")
         """
+        # Transposition table: position key -> (depth, value, flag, best_move)
+        self.tt = {}
+        # Cancel event of the running search, checked at every node
+        self._cancel: Optional[threading.Event] = None
+        # Opened on first use; False once the book turned out to be unavailable
+        self._book = None
         self.set_difficulty(difficulty)
     
     def set_difficulty(self, difficulty: str) -> None:
@@ -120,6 +214,8 @@ class ChessAI:
             difficulty = "medium"
         
         self.difficulty = difficulty
+        # Stored scores depend on the evaluation settings below
+        self.tt.clear()
         
         # Configure search depth based on difficulty
         if difficulty == "easy":
@@ -135,15 +231,18 @@ class ChessAI:
             self.use_opening_book = True
             self.use_positional = True
     
-    def get_best_move(self, board: chess.Board) -> Optional[chess.Move]:
+    def get_best_move(self, board: chess.Board,
+                      cancel: Optional[threading.Event] = None) -> Optional[chess.Move]:
         """
         Get the best move for the current position based on the AI difficulty.
         
         Args:
             board: Current chess board position
+            cancel: Event that stops the search as soon as it is set
             
         Returns:
-            Optional[chess.Move]: Best move according to the AI
+            Optional[chess.Move]: Best move according to the AI, or None if
+            the search was cancelled
         """
         legal_moves = list(board.legal_moves)
         if not legal_moves:
@@ -153,38 +252,131 @@ class ChessAI:
         if self.difficulty == "easy":
             return self._get_easy_move(board, legal_moves)
         
-        # Medium and Hard: Use minimax with alpha-beta pruning
-        best_move = None
-        best_value = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
+        # Play straight from the opening book while the position is in it
+        if self.use_opening_book:
+            book_move = self._get_book_move(board)
+            if book_move is not None:
+                return book_move
+        
+        # Medium and Hard: Use negamax with alpha-beta pruning
+        if len(self.tt) > self.TT_MAX_ENTRIES:
+            self.tt.clear()
         
         # Add some randomness to make the AI less predictable
         random.shuffle(legal_moves)
         
-        # Iterative deepening for better move ordering
-        for depth in range(1, self.search_depth + 1):
-            current_best_move = None
-            current_best_value = float('-inf')
+        # Try captures first; the sort is stable so equal moves stay shuffled
+        legal_moves.sort(key=lambda move: self._move_order_key(board, move))
+        
+        self._cancel = cancel
+        try:
+            best_move, _ = self._iterative_deepening(board, legal_moves, self.search_depth)
+        except _SearchCancelled:
+            return None
+        finally:
+            self._cancel = None
+        
+        return best_move or random.choice(legal_moves)
+    
+    def _get_book_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """
+        Pick a weighted random move from the opening book.
+        
+        Args:
+            board: Current chess board position
+            
+        Returns:
+            Optional[chess.Move]: Book move, or None if the position is not
+            in the book or no book is installed
+        """
+        if self._book is None:
+            try:
+                self._book = chess.polyglot.MemoryMappedReader(self.OPENING_BOOK_PATH)
+            except OSError:
+                self._book = False
+        if not self._book:
+            return None
+        
+        try:
+            return self._book.weighted_choice(board).move
+        except IndexError:
+            return None
+    
+    def _iterative_deepening(self, board: chess.Board, legal_moves: List[chess.Move],
+                             max_depth: int) -> Tuple[Optional[chess.Move], Optional[float]]:
+        """
+        Search the root moves with increasing depth, reusing each iteration's
+        result for move ordering and the aspiration window of the next one.
+        
+        Args:
+            board: Current chess board position
+            legal_moves: Root moves to search, in initial search order
+            max_depth: Depth of the last iteration
             
-            for move in legal_moves:
-                board.push(move)
-                # Call minimax for the opponent's turn (minimizing player)
-                value = self._minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-                
-                if value > current_best_value:
-                    current_best_value = value
-                    current_best_move = move
-                    
-                alpha = max(alpha, current_best_value)
+        Returns:
+            Tuple[Optional[chess.Move], Optional[float]]: Best move and its evaluation score
+        """
+        legal_moves = list(legal_moves)
+        best_move = None
+        best_value = None
+        
+        for depth in range(1, max_depth + 1):
+            # Search a narrow window around the previous iteration's score
+            if best_value is None:
+                alpha, beta = float('-inf'), float('inf')
+            else:
+                alpha = best_value - self.ASPIRATION_WINDOW
+                beta = best_value + self.ASPIRATION_WINDOW
+            
+            current_best_move, current_best_value = self._search_root(board, legal_moves, depth, alpha, beta)
+            
+            # The score fell outside the window, re-search with a full window
+            if current_best_value <= alpha or current_best_value >= beta:
+                current_best_move, current_best_value = self._search_root(
+                    board, legal_moves, depth, float('-inf'), float('inf'))
             
             # Update the overall best move after each iteration
             if current_best_move:
                 best_move = current_best_move
                 best_value = current_best_value
+                # Search it first at the next depth
+                legal_moves.sort(key=lambda move: 0 if move == best_move else 1)
         
-        return best_move or random.choice(legal_moves)
+        return best_move, best_value
+    
+    def _search_root(self, board: chess.Board, legal_moves: List[chess.Move], depth: int,
+                     alpha: float, beta: float) -> Tuple[Optional[chess.Move], float]:
+        """
+        Search every root move to a fixed depth.
+        
+        Args:
+            board: Current chess board position
+            legal_moves: Legal moves of the position, in search order
+            depth: Search depth
+            alpha: Alpha value for pruning
+            beta: Beta value for pruning
+            
+        Returns:
+            Tuple[Optional[chess.Move], float]: Best move and its evaluation score
+        """
+        best_move = None
+        best_value = float('-inf')
+        
+        for move in legal_moves:
+            board.push(move)
+            # Search the opponent's reply and negate its score
+            value = -self._negamax(board, depth - 1, -beta, -alpha)
+            board.pop()
+            
+            if value > best_value:
+                best_value = value
+                best_move = move
+            
+            alpha = max(alpha, best_value)
+            if alpha >= beta:
+                break
+        
+        return best_move, best_value
     
     def _get_easy_move(self, board: chess.Board, legal_moves: List[chess.Move]) -> chess.Move:
         """
@@ -201,92 +393,259 @@ class ChessAI:
         if random.random() < 0.1:
             return random.choice(legal_moves)
         
-        # Check if any move is a capture, and if so prioritize it
-        capturing_moves = [move for move in legal_moves if board.is_capture(move)]
-        if capturing_moves:
-            # 80% chance of choosing a capture when available
-            if random.random() < 0.8:
-                return random.choice(capturing_moves)
+        # Scan the moves in random order: the first match found is then a
+        # uniformly random pick, without classifying every legal move
+        shuffled_moves = random.sample(legal_moves, len(legal_moves))
+        
+        # 80% chance of choosing a capture when available
+        if random.random() < 0.8:
+            for move in shuffled_moves:
+                if board.is_capture(move):
+                    return move
         
-        # Check if any move gives check
-        checking_moves = [move for move in legal_moves if board.gives_check(move)]
-        if checking_moves:
-            # 70% chance of choosing a checking move when available
-            if random.random() < 0.7:
-                return random.choice(checking_moves)
+        # 70% chance of choosing a checking move when available
+        if random.random() < 0.7:
+            for move in shuffled_moves:
+                if board.gives_check(move):
+                    return move
         
         # Otherwise choose a random move
         return random.choice(legal_moves)
     
-    def _minimax(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizing: bool) -> float:
+    def _order_moves(self, board: chess.Board, tt_move: Optional[chess.Move] = None) -> List[chess.Move]:
         """
-        Minimax algorithm with alpha-beta pruning for chess move evaluation.
+        Get the legal moves ordered so that the most promising ones are searched first.
+        
+        Args:
+            board: Current chess board position
+            tt_move: Optional best move from the transposition table, searched first
+            
+        Returns:
+            List[chess.Move]: Ordered list of legal moves
+        """
+        moves = list(board.legal_moves)
+        moves.sort(key=lambda move: self._move_order_key(board, move, tt_move))
+        return moves
+    
+    def _move_order_key(self, board: chess.Board, move: chess.Move,
+                        tt_move: Optional[chess.Move] = None) -> tuple:
+        """
+        Get the sort key of a move: hash move first, then captures ranked by
+        Most-Valuable-Victim/Least-Valuable-Attacker, then quiet moves.
+        
+        Args:
+            board: Current chess board position
+            move: Move to rank
+            tt_move: Optional best move from the transposition table
+            
+        Returns:
+            tuple: Sort key, lower values are searched first
+        """
+        if move == tt_move:
+            return (0, 0)
+        
+        if board.is_capture(move):
+            # En passant is the only capture with an empty target square
+            victim = board.piece_type_at(move.to_square) or chess.PAWN
+            attacker = board.piece_type_at(move.from_square)
+            return (1, -(self.PIECE_VALUES[victim] * 10 - self.PIECE_VALUES[attacker]))
+        
+        return (2, 0)
+    
+    def _negamax(self, board: chess.Board, depth: int, alpha: float, beta: float) -> float:
+        """
+        Negamax algorithm with alpha-beta pruning for chess move evaluation.
+        
+        The tree is walked with an explicit stack of frames instead of
+        recursion, which avoids the cost of a Python call per node.
         
         Args:
             board: Current chess board position
             depth: Current search depth
             alpha: Alpha value for pruning
             beta: Beta value for pruning
-            maximizing: Whether this is a maximizing or minimizing player
             
         Returns:
-            float: Evaluation score of the position
+            float: Evaluation score of the position relative to the side to move
         """
-        if depth == 0 or board.is_game_over():
-            return self._evaluate_position(board)
+        value, frame = self._enter_node(board, depth, alpha, beta)
+        if frame is None:
+            return value
         
-        if maximizing:
-            value = float('-inf')
-            for move in board.legal_moves:
+        cancel = self._cancel
+        stack = [frame]
+        while True:
+            frame = stack[-1]
+            
+            if frame.index < len(frame.moves) and frame.alpha < frame.beta:
+                if cancel is not None and cancel.is_set():
+                    raise _SearchCancelled()
+                # Descend into the next move
+                move = frame.moves[frame.index]
+                frame.index += 1
                 board.push(move)
-                value = max(value, self._minimax(board, depth - 1, alpha, beta, False))
+                child_value, child = self._enter_node(board, frame.depth - 1, -frame.beta, -frame.alpha)
+                if child is not None:
+                    stack.append(child)
+                    continue
+                board.pop()
+                value = -child_value
+            else:
+                # All moves searched or beta cutoff: return to the parent
+                stack.pop()
+                self._store_tt(frame.key, frame.depth, frame.value, frame.alpha_orig, frame.beta_orig,
+                               frame.best_move)
+                if not stack:
+                    return frame.value
                 board.pop()
-                alpha = max(alpha, value)
+                value = -frame.value
+                frame = stack[-1]
+                move = frame.moves[frame.index - 1]
+            
+            if value > frame.value:
+                frame.value = value
+                frame.best_move = move
+            frame.alpha = max(frame.alpha, frame.value)
+    
+    def _enter_node(self, board: chess.Board, depth: int, alpha: float,
+                    beta: float) -> Tuple[Optional[float], Optional["_SearchFrame"]]:
+        """
+        Start searching a node, resolving it immediately when possible.
+        
+        Args:
+            board: Current chess board position
+            depth: Current search depth
+            alpha: Alpha value for pruning
+            beta: Beta value for pruning
+            
+        Returns:
+            Tuple[Optional[float], Optional[_SearchFrame]]: Either the score of the
+            node, or a frame holding the moves that still have to be searched
+        """
+        alpha_orig, beta_orig = alpha, beta
+        
+        # Probe the transposition table. The transposition key is a tuple of
+        # the bitboards python-chess already maintains, which hashes far
+        # faster than recomputing a polyglot Zobrist hash piece by piece
+        key = board._transposition_key()
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_value, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == self.TT_EXACT:
+                    return tt_value, None
+                elif tt_flag == self.TT_LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
                 if alpha >= beta:
-                    break  # Beta cutoff
-            return value
+                    return tt_value, None
+        
+        if depth == 0:
+            # Resolve pending captures before scoring the position
+            value = self._quiescence(board, alpha, beta)
+            self._store_tt(key, depth, value, alpha_orig, beta_orig, None)
+            return value, None
+        
+        # Search the stored best move first, then captures by MVV-LVA
+        moves = self._order_moves(board, tt_move)
+        
+        # Only checkmate and stalemate end the search here; the costlier
+        # repetition and move-count rules of is_game_over() are skipped
+        if not moves:
+            return (-10000 if board.is_check() else 0), None
+        
+        return None, _SearchFrame(key, depth, alpha, beta, alpha_orig, beta_orig, moves)
+    
+    def _store_tt(self, key: Hashable, depth: int, value: float, alpha: float, beta: float,
+                  best_move: Optional[chess.Move]) -> None:
+        """
+        Store a search result in the transposition table.
+        
+        Args:
+            key: Transposition key of the position
+            depth: Remaining search depth the value was computed with
+            value: Evaluation score of the position
+            alpha: Alpha value the node was searched with
+            beta: Beta value the node was searched with
+            best_move: Best move found, if any
+        """
+        # Record the kind of bound the value represents
+        if value <= alpha:
+            flag = self.TT_UPPER
+        elif value >= beta:
+            flag = self.TT_LOWER
         else:
-            value = float('inf')
-            for move in board.legal_moves:
-                board.push(move)
-                value = min(value, self._minimax(board, depth - 1, alpha, beta, True))
-                board.pop()
-                beta = min(beta, value)
-                if beta <= alpha:
-                    break  # Alpha cutoff
-            return value
+            flag = self.TT_EXACT
+        self.tt[key] = (depth, value, flag, best_move)
     
-    def _evaluate_position(self, board: chess.Board) -> float:
+    def _quiescence(self, board: chess.Board, alpha: float, beta: float) -> float:
+        """
+        Quiescence search that only explores captures, so that positions are
+        never scored in the middle of an exchange.
+        
+        Args:
+            board: Current chess board position
+            alpha: Alpha value for pruning
+            beta: Beta value for pruning
+            
+        Returns:
+            float: Evaluation score relative to the side to move
+        """
+        # Generate the legal moves once for both the mobility term and the captures
+        moves = list(board.legal_moves)
+        
+        stand_pat = self._evaluate_position(board, len(moves))
+        if stand_pat >= beta:
+            return beta
+        alpha = max(alpha, stand_pat)
+        
+        captures = [move for move in moves if board.is_capture(move)]
+        captures.sort(key=lambda move: self._move_order_key(board, move))
+        
+        for move in captures:
+            board.push(move)
+            score = -self._quiescence(board, -beta, -alpha)
+            board.pop()
+            if score >= beta:
+                return beta
+            alpha = max(alpha, score)
+        
+        return alpha
+    
+    def _evaluate_position(self, board: chess.Board, num_moves: Optional[int] = None) -> float:
         """
         Evaluate the current board position.
         
         Args:
             board: Current chess board position
+            num_moves: Number of legal moves in the position, if already known
             
         Returns:
-            float: Evaluation score (positive for white advantage, negative for black)
+            float: Evaluation score relative to the side to move
         """
-        if board.is_checkmate():
-            # Return a high value for checkmate, considering whose turn it is
-            return -10000 if board.turn else 10000
+        if num_moves is None:
+            num_moves = board.legal_moves.count()
         
-        if board.is_stalemate() or board.is_insufficient_material():
-            return 0  # Draw
+        if num_moves == 0:
+            # Checkmate if the side to move is in check, stalemate otherwise
+            return -10000 if board.is_check() else 0
         
-        # Material evaluation
-        material_score = self._evaluate_material(board)
+        if board.is_insufficient_material():
+            return 0  # Draw
         
-        # Positional evaluation (only for medium and hard difficulty)
-        positional_score = 0
+        # Material and positional evaluation (positional only for medium and
+        # hard difficulty, where both come from one piece-square pass)
         if self.use_positional:
-            positional_score = self._evaluate_position_score(board)
+            material_score = 0
+            positional_score = self._evaluate_position_score(board, include_material=True)
+        else:
+            material_score = self._evaluate_material(board)
+            positional_score = 0
         
         # Mobility evaluation - count number of legal moves
-        mobility_score = 0
-        if board.turn:  # White's turn
-            mobility_score = len(list(board.legal_moves)) * 5
-        else:  # Black's turn
-            mobility_score = -len(list(board.legal_moves)) * 5
+        mobility_score = num_moves * 5 if board.turn else -num_moves * 5
         
         # King safety (simplified)
         king_safety = self._evaluate_king_safety(board)
@@ -294,7 +653,7 @@ class ChessAI:
         # Combine all evaluation components
         total_score = material_score + positional_score + mobility_score + king_safety
         
-        # Return score from white's perspective
+        # Return score from the perspective of the side to move
         return total_score if board.turn else -total_score
     
     def _evaluate_material(self, board: chess.Board) -> float:
@@ -307,21 +666,26 @@ class ChessAI:
         Returns:
             float: Material evaluation score
         """
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
         score = 0
         
-        # Count material for each piece type
-        for piece_type in chess.PIECE_TYPES:
-            score += len(board.pieces(piece_type, chess.WHITE)) * self.PIECE_VALUES[piece_type]
-            score -= len(board.pieces(piece_type, chess.BLACK)) * self.PIECE_VALUES[piece_type]
+        # Popcount the raw bitboards instead of building SquareSets
+        for piece_type, mask in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                                 (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                                 (chess.QUEEN, board.queens), (chess.KING, board.kings)):
+            count = chess.popcount(mask & white) - chess.popcount(mask & black)
+            score += count * self.PIECE_VALUES[piece_type]
         
         return score
     
-    def _evaluate_position_score(self, board: chess.Board) -> float:
+    def _evaluate_position_score(self, board: chess.Board, include_material: bool = False) -> float:
         """
         Evaluate the positional quality of the pieces.
         
         Args:
             board: Current chess board
+            include_material: Whether to add the material balance to the score
             
         Returns:
             float: Positional evaluation score
@@ -330,40 +694,29 @@ class ChessAI:
         
         # Determine game phase (middle or endgame)
         is_endgame = self._is_endgame(board)
-        
-        # Evaluate piece positions using piece-square tables
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is None:
-                continue
-            
-            # Get the appropriate index for the piece-square table
-            # For black pieces, we need to flip the square index
-            square_idx = square
-            if not piece.color:
-                square_idx = chess.square_mirror(square)
-            
-            if piece.piece_type == chess.PAWN:
-                value = self.PAWN_TABLE[square_idx]
-            elif piece.piece_type == chess.KNIGHT:
-                value = self.KNIGHT_TABLE[square_idx]
-            elif piece.piece_type == chess.BISHOP:
-                value = self.BISHOP_TABLE[square_idx]
-            elif piece.piece_type == chess.ROOK:
-                value = self.ROOK_TABLE[square_idx]
-            elif piece.piece_type == chess.QUEEN:
-                value = self.QUEEN_TABLE[square_idx]
-            elif piece.piece_type == chess.KING:
-                if is_endgame:
-                    value = self.KING_END_GAME_TABLE[square_idx]
-                else:
-                    value = self.KING_MIDDLE_GAME_TABLE[square_idx]
-            
-            # Add or subtract the positional value based on piece color
-            if piece.color:  # White
-                score += value
-            else:  # Black
-                score -= value
+        king_offset = 6 * 64 if is_endgame else (chess.KING - 1) * 64
+        if include_material:
+            pst = self.PST_MATERIAL
+            pst_mirrored = self.PST_MATERIAL_MIRRORED
+        else:
+            pst = self.PST
+            pst_mirrored = self.PST_MIRRORED
+        
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
+        
+        # Evaluate piece positions using piece-square tables, visiting only
+        # the set bits of each piece bitboard
+        for mask, offset in ((board.pawns, (chess.PAWN - 1) * 64),
+                             (board.knights, (chess.KNIGHT - 1) * 64),
+                             (board.bishops, (chess.BISHOP - 1) * 64),
+                             (board.rooks, (chess.ROOK - 1) * 64),
+                             (board.queens, (chess.QUEEN - 1) * 64),
+                             (board.kings, king_offset)):
+            for square in chess.scan_forward(mask & white):
+                score += pst[offset + square]
+            for square in chess.scan_forward(mask & black):
+                score -= pst_mirrored[offset + square]
         
         return score
     
@@ -377,9 +730,6 @@ class ChessAI:
         Returns:
             float: King safety evaluation score
         """
-        score = 0
-        
-        # Count the defenders around each king
         white_king_square = board.king(chess.WHITE)
         black_king_square = board.king(chess.BLACK)
         
@@ -387,29 +737,12 @@ class ChessAI:
         if white_king_square is None or black_king_square is None:
             return 0
         
-        # Get adjacent squares to the kings
-        white_king_zone = list(chess.SquareSet(chess.BB_KING_ATTACKS[white_king_square]))
-        black_king_zone = list(chess.SquareSet(chess.BB_KING_ATTACKS[black_king_square]))
-        
-        # Count defenders in king zones (simplified)
-        white_defenders = 0
-        black_defenders = 0
-        
-        for square in white_king_zone:
-            piece = board.piece_at(square)
-            if piece and piece.color == chess.WHITE:
-                white_defenders += 1
-        
-        for square in black_king_zone:
-            piece = board.piece_at(square)
-            if piece and piece.color == chess.BLACK:
-                black_defenders += 1
+        # Count own pieces on the squares adjacent to each king
+        white_defenders = chess.popcount(chess.BB_KING_ATTACKS[white_king_square] & board.occupied_co[chess.WHITE])
+        black_defenders = chess.popcount(chess.BB_KING_ATTACKS[black_king_square] & board.occupied_co[chess.BLACK])
         
         # Penalize exposed kings and reward defended kings
-        score += white_defenders * 10
-        score -= black_defenders * 10
-        
-        return score
+        return (white_defenders - black_defenders) * 10
     
     def _is_endgame(self, board: chess.Board) -> bool:
         """
@@ -423,21 +756,21 @@ class ChessAI:
         """
         # Simplified endgame detection: if queens are off the board
         # or if both sides have less than 13 points in non-pawn material
-        white_queens = len(board.pieces(chess.QUEEN, chess.WHITE))
-        black_queens = len(board.pieces(chess.QUEEN, chess.BLACK))
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
         
-        if white_queens == 0 and black_queens == 0:
+        if not board.queens:
             return True
         
         # Count material excluding pawns and kings
-        white_material = (len(board.pieces(chess.KNIGHT, chess.WHITE)) * 3 +
-                        len(board.pieces(chess.BISHOP, chess.WHITE)) * 3 +
-                        len(board.pieces(chess.ROOK, chess.WHITE)) * 5 +
-                        len(board.pieces(chess.QUEEN, chess.WHITE)) * 9)
+        white_material = (chess.popcount(board.knights & white) * 3 +
+                          chess.popcount(board.bishops & white) * 3 +
+                          chess.popcount(board.rooks & white) * 5 +
+                          chess.popcount(board.queens & white) * 9)
         
-        black_material = (len(board.pieces(chess.KNIGHT, chess.BLACK)) * 3 +
-                         len(board.pieces(chess.BISHOP, chess.BLACK)) * 3 +
-                         len(board.pieces(chess.ROOK, chess.BLACK)) * 5 +
-                         len(board.pieces(chess.QUEEN, chess.BLACK)) * 9)
+        black_material = (chess.popcount(board.knights & black) * 3 +
+                          chess.popcount(board.bishops & black) * 3 +
+                          chess.popcount(board.rooks & black) * 5 +
+                          chess.popcount(board.queens & black) * 9)
         
-        return white_material < 13 and black_material < 13 
\ No newline at end of file
+        return white_material < 13 and black_material < 13
\ No newline at end of file
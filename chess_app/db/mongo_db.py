@@ -1,26 +1,198 @@
 """
 MongoDB database connection and helper functions for the chess application.
 """
-from datetime import datetime
+import os
+import secrets
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+import chess
 from flask_pymongo import PyMongo
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
 from werkzeug.security import generate_password_hash, check_password_hash
 from bson.objectid import ObjectId
 
 # MongoDB connection instance
 mongo = PyMongo()
 
+# Version of the indexes and document fields init_app sets up; bump it
+# whenever _migrate changes
+SCHEMA_VERSION = 2
+
+# Connections kept per process for concurrent requests
+MONGO_MAX_POOL_SIZE = 20
+
+# Seconds an auth token handed to the game client stays valid
+TOKEN_LIFETIME = 1800
+
+# Password hashing method: scrypt runs in C through hashlib, unlike the
+# iteration-heavy PBKDF2 default of older Werkzeug releases
+PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+
+# Win percentage computed server-side from a user document's counters
+_WIN_PERCENTAGE_EXPR = {
+    "$cond": [
+        {"$gt": ["$games_played", 0]},
+        {"$multiply": [{"$divide": ["$wins", "$games_played"]}, 100]},
+        0
+    ]
+}
+
+# Fields of a user document needed by the application
+_USER_PROJECTION = {
+    "username": 1,
+    "password_hash": 1,
+    "games_played": 1,
+    "wins": 1,
+    "losses": 1,
+    "draws": 1,
+    "win_percentage": 1
+}
+
+# In-process caches of recent reads: key -> (expiry time, value), oldest first.
+# They are shared by all request threads, so every access holds _cache_lock
+_cache_lock = threading.Lock()
+
+# Seconds a leaderboard result is served from memory, cleared when stats change
+LEADERBOARD_CACHE_TTL = 60
+LEADERBOARD_CACHE_SIZE = 16
+_top_players_cache = {}
+
+# Saved games are never modified, only deleted, so recently read ones are
+# kept for the load -> play -> launch sequence of pages
+SAVED_GAME_CACHE_TTL = 120
+SAVED_GAME_CACHE_SIZE = 256
+_saved_game_cache = {}
+
+# Users looked up by ID, mostly by Flask-Login on every authenticated
+# request; entries are dropped when this process changes the user, and
+# expire quickly for changes made by other processes
+USER_CACHE_TTL = 30
+USER_CACHE_SIZE = 1024
+_user_cache = {}
+
+# Auth tokens are never revoked, so a token's user is kept until it expires
+TOKEN_CACHE_SIZE = 4096
+_token_cache = {}
+
+def _cache_get(cache, key):
+    """Get an unexpired value from an in-process cache, or None."""
+    with _cache_lock:
+        entry = cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _cache_put(cache, key, value, ttl, max_size):
+    """Store a value in an in-process cache, evicting the oldest entry when full."""
+    with _cache_lock:
+        cache.pop(key, None)
+        if len(cache) >= max_size:
+            del cache[next(iter(cache))]
+        cache[key] = (time.monotonic() + ttl, value)
+
+def _cache_drop(cache, key=None):
+    """Remove one key from an in-process cache, or every entry if key is None."""
+    with _cache_lock:
+        if key is None:
+            cache.clear()
+        else:
+            cache.pop(key, None)
+
+def _drop_user_stats(user_id):
+    """Forget cached reads that include a user's game statistics."""
+    # The ranking may have changed
+    _cache_drop(_top_players_cache)
+    _cache_drop(_user_cache, user_id)
+
+# Large per-game fields that list views never display
+_GAME_LISTING_PROJECTION = {"moves": 0, "final_fen": 0}
+_SAVED_GAME_LISTING_PROJECTION = {"moves": 0, "fen": 0}
+
+# Move lists are stored as little-endian 16-bit codes:
+# from square (6 bits), to square (6 bits), promotion piece type (4 bits)
+_MOVE_CODE = struct.Struct("<H")
+
+def pack_moves(uci_moves):
+    """Pack a list of UCI move strings into two bytes per move."""
+    codes = []
+    for uci in uci_moves:
+        move = chess.Move.from_uci(uci)
+        codes.append(move.from_square << 10 | move.to_square << 4 | (move.promotion or 0))
+    return struct.pack(f"<{len(codes)}H", *codes)
+
+def unpack_moves(data):
+    """Unpack bytes produced by pack_moves into a list of UCI move strings."""
+    return [
+        chess.Move(code >> 10, (code >> 4) & 63, (code & 15) or None).uci()
+        for (code,) in _MOVE_CODE.iter_unpack(data)
+    ]
+
+def _encode_moves(moves):
+    """Pack a move list for storage, keeping it as is if it isn't valid UCI."""
+    try:
+        return pack_moves(moves)
+    except (TypeError, ValueError):
+        return list(moves)
+
+def _decode_moves(doc):
+    """Replace a document's packed move list with UCI strings, in place."""
+    if doc and isinstance(doc.get("moves"), bytes):
+        doc["moves"] = unpack_moves(doc["moves"])
+    return doc
+
 def init_app(app):
     """Initialize the MongoDB connection with the Flask app."""
-    app.config["MONGO_URI"] = "mongodb://localhost:27017/chess_app"
-    mongo.init_app(app)
+    app.config["MONGO_URI"] = os.environ.get("MONGO_URI", "mongodb://localhost:27017/chess_app")
+    # One client per process, shared by all request threads. The pool only
+    # needs to cover the server's concurrent requests, and an unreachable
+    # server fails fast instead of after pymongo's 30 second default
+    mongo.init_app(app, maxPoolSize=MONGO_MAX_POOL_SIZE, minPoolSize=2,
+                   serverSelectionTimeoutMS=3000, connectTimeoutMS=3000)
     
-    # Create indexes for better query performance
+    # Indexes and data migrations run once per schema version, not on every start
     with app.app_context():
-        # Create unique index on username
-        mongo.db.users.create_index("username", unique=True)
-        # Create index for game queries
-        mongo.db.games.create_index("user_id")
-        mongo.db.saved_games.create_index("user_id")
+        schema = mongo.db.meta.find_one({"_id": "schema"})
+        if not schema or schema.get("version", 0) < SCHEMA_VERSION:
+            _migrate()
+            mongo.db.meta.update_one({"_id": "schema"}, {"$set": {"version": SCHEMA_VERSION}}, upsert=True)
+
+def _migrate():
+    """Create the indexes and backfill fields of the current schema version."""
+    # Create indexes for better query performance, one batch per collection
+    mongo.db.users.create_indexes([
+        # Unique index on username
+        IndexModel([("username", ASCENDING)], unique=True, background=True),
+        # Leaderboard: sort by win percentage, filter on games played
+        IndexModel([("win_percentage", DESCENDING), ("games_played", ASCENDING)], background=True)
+    ])
+    # Game listings: filter on the user, newest first, without an in-memory
+    # sort; _id breaks ties between games ending in the same millisecond
+    mongo.db.games.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("end_time", DESCENDING), ("_id", DESCENDING)], background=True)
+    ])
+    mongo.db.saved_games.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], background=True)
+    ])
+    # The indexes of earlier versions are prefixes of these
+    for collection, index_name in ((mongo.db.games, "user_id_1"),
+                                   (mongo.db.saved_games, "user_id_1"),
+                                   (mongo.db.games, "user_id_1_end_time_-1")):
+        try:
+            collection.drop_index(index_name)
+        except OperationFailure:
+            pass
+    # Let MongoDB delete expired auth tokens
+    mongo.db.auth_tokens.create_indexes([
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=TOKEN_LIFETIME, background=True)
+    ])
+    
+    # Backfill the materialized win percentage for users created before it existed
+    mongo.db.users.update_many({"win_percentage": {"$exists": False}}, [
+        {"$set": {"win_percentage": _WIN_PERCENTAGE_EXPR}}
+    ])
 
 # User-related functions
 def get_user_by_id(user_id):
@@ -30,22 +202,30 @@ def get_user_by_id(user_id):
             user_id = ObjectId(user_id)
         except:
             return None
-    return mongo.db.users.find_one({"_id": user_id})
+    
+    user = _cache_get(_user_cache, user_id)
+    if user is None:
+        user = mongo.db.users.find_one({"_id": user_id}, _USER_PROJECTION)
+        if user is None:
+            return None
+        _cache_put(_user_cache, user_id, user, USER_CACHE_TTL, USER_CACHE_SIZE)
+    return dict(user)
 
 def get_user_by_username(username):
     """Get a user by username."""
-    return mongo.db.users.find_one({"username": username})
+    return mongo.db.users.find_one({"username": username}, _USER_PROJECTION)
 
 def create_user(username, password):
     """Create a new user."""
     user_data = {
         "username": username,
-        "password_hash": generate_password_hash(password),
+        "password_hash": generate_password_hash(password, method=PASSWORD_HASH_METHOD),
         "created_at": datetime.utcnow(),
         "games_played": 0,
         "wins": 0,
         "losses": 0,
-        "draws": 0
+        "draws": 0,
+        "win_percentage": 0
     }
     result = mongo.db.users.insert_one(user_data)
     return result.inserted_id
@@ -54,9 +234,18 @@ def check_password(user, password):
     """Check if the provided password matches the user's hash."""
     if not user or "password_hash" not in user:
         return False
-    return check_password_hash(user["password_hash"], password)
+    if not check_password_hash(user["password_hash"], password):
+        return False
+    
+    # Migrate legacy hashes to the current method on first successful login
+    if not user["password_hash"].startswith(PASSWORD_HASH_METHOD + "$") and "_id" in user:
+        password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+        mongo.db.users.update_one({"_id": user["_id"]}, {"$set": {"password_hash": password_hash}})
+        _cache_drop(_user_cache, user["_id"])
+        user["password_hash"] = password_hash
+    return True
 
-def update_user_stats(user_id, result):
+def update_user_stats(user_id, result, session=None):
     """Update a user's game statistics."""
     if isinstance(user_id, str):
         try:
@@ -65,24 +254,67 @@ def update_user_stats(user_id, result):
             return False
             
     # Increment the appropriate stats based on game result
-    update = {
-        "$inc": {
-            "games_played": 1
-        }
+    increments = {
+        "games_played": 1
     }
     
     if result == "win":
-        update["$inc"]["wins"] = 1
+        increments["wins"] = 1
     elif result == "loss":
-        update["$inc"]["losses"] = 1
+        increments["losses"] = 1
     elif result == "draw":
-        update["$inc"]["draws"] = 1
+        increments["draws"] = 1
+    
+    # Update the counters and the materialized win percentage in one atomic
+    # pipeline update, so the leaderboard can sort on an indexed field
+    update = [
+        {"$set": {
+            field: {"$add": [{"$ifNull": ["$" + field, 0]}, amount]}
+            for field, amount in increments.items()
+        }},
+        {"$set": {"win_percentage": _WIN_PERCENTAGE_EXPR}}
+    ]
     
-    result = mongo.db.users.update_one({"_id": user_id}, update)
+    result = mongo.db.users.update_one({"_id": user_id}, update, session=session)
+    # Inside a transaction a concurrent read could re-cache the uncommitted
+    # state, so a caller passing a session drops the cache after committing
+    if session is None:
+        _drop_user_stats(user_id)
     return result.modified_count > 0
 
+# Auth token functions
+def create_auth_token(user_id):
+    """Create an auth token for a user and return it."""
+    token = secrets.token_hex(16)
+    mongo.db.auth_tokens.insert_one({
+        "_id": token,
+        "user_id": str(user_id),
+        "created_at": datetime.utcnow()
+    })
+    _cache_put(_token_cache, token, str(user_id), TOKEN_LIFETIME, TOKEN_CACHE_SIZE)
+    return token
+
+def get_token_user_id(token):
+    """Get the ID of the user an unexpired auth token belongs to."""
+    # The TTL index removes expired tokens only about once a minute
+    user_id = _cache_get(_token_cache, token)
+    if user_id is not None:
+        return user_id
+    
+    now = datetime.utcnow()
+    token_doc = mongo.db.auth_tokens.find_one({
+        "_id": token,
+        "created_at": {"$gt": now - timedelta(seconds=TOKEN_LIFETIME)}
+    })
+    if not token_doc:
+        return None
+    
+    remaining = TOKEN_LIFETIME - (now - token_doc["created_at"]).total_seconds()
+    _cache_put(_token_cache, token, token_doc["user_id"], remaining, TOKEN_CACHE_SIZE)
+    return token_doc["user_id"]
+
 # Game-related functions
-def save_game_record(user_id, game_data):
+def save_game_record(user_id, game_data, session=None):
     """Save a completed game record."""
     if isinstance(user_id, str):
         try:
@@ -96,15 +328,33 @@ def save_game_record(user_id, game_data):
         "end_time": game_data.get("end_time", datetime.utcnow()),
         "result": game_data.get("result"),
         "difficulty": game_data.get("difficulty", "medium"),
-        "moves": game_data.get("moves", []),
+        "moves": _encode_moves(game_data.get("moves", [])),
         "final_fen": game_data.get("final_fen")
     }
     
-    result = mongo.db.games.insert_one(game_doc)
+    result = mongo.db.games.insert_one(game_doc, session=session)
     return result.inserted_id
 
-def get_user_games(user_id, limit=None):
-    """Get a user's game history."""
+def record_completed_game(user_id, game_data):
+    """Save a completed game record and count its result in the user's statistics."""
+    def record(session):
+        game_id = save_game_record(user_id, game_data, session=session)
+        update_user_stats(user_id, game_data.get("result"), session=session)
+        return game_id
+    
+    # Both writes commit together where transactions are available; they
+    # need a replica set or sharded cluster, not a standalone server
+    if mongo.cx.topology_description.topology_type_name in ("ReplicaSetWithPrimary", "Sharded"):
+        with mongo.cx.start_session() as session:
+            game_id = session.with_transaction(record)
+        if isinstance(user_id, str) and ObjectId.is_valid(user_id):
+            user_id = ObjectId(user_id)
+        _drop_user_stats(user_id)
+        return game_id
+    return record(None)
+
+def get_user_games(user_id, limit=None, include_moves=False, before=None):
+    """Get a user's game history newest first, without move lists unless requested."""
     if isinstance(user_id, str):
         try:
             user_id = ObjectId(user_id)
@@ -112,22 +362,73 @@ def get_user_games(user_id, limit=None):
             return []
     
     query = {"user_id": user_id}
-    cursor = mongo.db.games.find(query).sort("end_time", -1)
+    if before is not None:
+        # before is the (end_time, _id) of the previous page's last game.
+        # Games ending at the same time are ordered by _id, so none of them
+        # are skipped between pages
+        end_time, game_id = before
+        query["$or"] = [
+            {"end_time": {"$lt": end_time}},
+            {"end_time": end_time, "_id": {"$lt": game_id}}
+        ]
+    projection = None if include_moves else _GAME_LISTING_PROJECTION
+    cursor = mongo.db.games.find(query, projection).sort([("end_time", -1), ("_id", -1)])
     
     if limit:
         cursor = cursor.limit(limit)
         
-    return list(cursor)
+    return [_decode_moves(game) for game in cursor]
 
 def get_game_by_id(game_id):
     """Get a game by its ID."""
     try:
         if isinstance(game_id, str):
             game_id = ObjectId(game_id)
-        return mongo.db.games.find_one({"_id": game_id})
+        return _decode_moves(mongo.db.games.find_one({"_id": game_id}))
     except:
         return None
 
+def get_user_dashboard_games(user_id, recent_limit=5):
+    """Get a user's most recent games and saved games in one round trip."""
+    if isinstance(user_id, str):
+        try:
+            user_id = ObjectId(user_id)
+        except:
+            return [], []
+    
+    # Start from the user document and join both listings onto it
+    pipeline = [
+        {"$match": {"_id": user_id}},
+        {"$project": {"_id": 1}},
+        {"$lookup": {
+            "from": "games",
+            "let": {"user_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_id", "$$user_id"]}}},
+                # Ties broken by _id, in the order of the history page and index
+                {"$sort": {"end_time": -1, "_id": -1}},
+                {"$limit": recent_limit},
+                {"$project": _GAME_LISTING_PROJECTION}
+            ],
+            "as": "recent_games"
+        }},
+        {"$lookup": {
+            "from": "saved_games",
+            "let": {"user_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_id", "$$user_id"]}}},
+                {"$sort": {"created_at": -1}},
+                {"$project": _SAVED_GAME_LISTING_PROJECTION}
+            ],
+            "as": "saved_games"
+        }}
+    ]
+    
+    user = next(mongo.db.users.aggregate(pipeline), None)
+    if not user:
+        return [], []
+    return user["recent_games"], user["saved_games"]
+
 # Saved Game functions
 def save_game_state(user_id, game_data):
     """Save a game state for future continuation."""
@@ -142,31 +443,46 @@ def save_game_state(user_id, game_data):
         "name": game_data.get("name", f"Game_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"),
         "created_at": datetime.utcnow(),
         "fen": game_data.get("fen"),
-        "moves": game_data.get("moves", []),
+        "moves": _encode_moves(game_data.get("moves", [])),
         "difficulty": game_data.get("difficulty", "medium")
     }
     
     result = mongo.db.saved_games.insert_one(saved_game)
     return result.inserted_id
 
-def get_user_saved_games(user_id):
-    """Get a user's saved games."""
+def get_user_saved_games(user_id, include_moves=False):
+    """Get a user's saved games, without positions and moves unless requested."""
     if isinstance(user_id, str):
         try:
             user_id = ObjectId(user_id)
         except:
             return []
-            
-    return list(mongo.db.saved_games.find({"user_id": user_id}).sort("created_at", -1))
+    
+    projection = None if include_moves else _SAVED_GAME_LISTING_PROJECTION
+    cursor = mongo.db.saved_games.find({"user_id": user_id}, projection).sort("created_at", -1)
+    return [_decode_moves(game) for game in cursor]
 
 def get_saved_game_by_id(game_id):
     """Get a saved game by its ID."""
     try:
         if isinstance(game_id, str):
             game_id = ObjectId(game_id)
-        return mongo.db.saved_games.find_one({"_id": game_id})
     except:
         return None
+    
+    cached = _cache_get(_saved_game_cache, game_id)
+    if cached is not None:
+        return dict(cached)
+    
+    try:
+        saved_game = _decode_moves(mongo.db.saved_games.find_one({"_id": game_id}))
+    except:
+        return None
+    
+    if saved_game:
+        _cache_put(_saved_game_cache, game_id, saved_game, SAVED_GAME_CACHE_TTL, SAVED_GAME_CACHE_SIZE)
+        return dict(saved_game)
+    return saved_game
 
 def delete_saved_game(game_id):
     """Delete a saved game by its ID."""
@@ -174,6 +490,7 @@ def delete_saved_game(game_id):
         if isinstance(game_id, str):
             game_id = ObjectId(game_id)
             
+        _cache_drop(_saved_game_cache, game_id)
         result = mongo.db.saved_games.delete_one({"_id": game_id})
         return result.deleted_count > 0
     except Exception as e:
@@ -183,23 +500,25 @@ def delete_saved_game(game_id):
 # Leaderboard functions
 def get_top_players(min_games=5, limit=10):
     """Get the top players by win percentage (minimum games required)."""
-    pipeline = [
-        {"$match": {"games_played": {"$gte": min_games}}},
-        {"$project": {
+    key = (min_games, limit)
+    cached = _cache_get(_top_players_cache, key)
+    if cached is not None:
+        return list(cached)
+    
+    # Served by the (win_percentage, games_played) index instead of an
+    # aggregation computing the ratio for every user
+    cursor = mongo.db.users.find(
+        {"games_played": {"$gte": min_games}},
+        {
             "username": 1,
             "games_played": 1,
             "wins": 1,
             "losses": 1,
             "draws": 1,
-            "win_percentage": {
-                "$multiply": [
-                    {"$divide": ["$wins", "$games_played"]},
-                    100
-                ]
-            }
-        }},
-        {"$sort": {"win_percentage": -1}},
-        {"$limit": limit}
-    ]
+            "win_percentage": 1
+        }
+    ).sort("win_percentage", DESCENDING).limit(limit)
     
-    return list(mongo.db.users.aggregate(pipeline))
+    top_players = list(cursor)
+    _cache_put(_top_players_cache, key, top_players, LEADERBOARD_CACHE_TTL, LEADERBOARD_CACHE_SIZE)
+    return list(top_players)
@@ -2,11 +2,48 @@
 Core chess game logic using python-chess library.
 """
 
+import array
 import chess
 import datetime
 import json
 import os
-from typing import List, Optional, Dict
+from collections import OrderedDict
+from typing import FrozenSet, List, Optional, Dict, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional faster JSON serializer
+    orjson = None
+
+# Directories save_game has already created, so repeated saves skip makedirs
+_ensured_dirs: Set[str] = set()
+
+
+def _encode_move(move: chess.Move) -> int:
+    """
+    Pack a move into 16 bits: from square (6 bits), to square (6 bits)
+    and promotion piece type (4 bits).
+    
+    Args:
+        move: Move to pack
+        
+    Returns:
+        int: Packed move
+    """
+    return move.from_square << 10 | move.to_square << 4 | (move.promotion or 0)
+
+
+def _decode_move(code: int) -> chess.Move:
+    """
+    Unpack a move packed by _encode_move.
+    
+    Args:
+        code: Packed move
+        
+    Returns:
+        chess.Move: Unpacked move
+    """
+    return chess.Move(code >> 10, (code >> 4) & 63, (code & 15) or None)
 
 
 class ChessGame:
@@ -15,6 +52,9 @@ class ChessGame:
     Uses python-chess library for game state representation and move validation.
     """
     
+    # Number of positions whose legal moves are kept in the cache
+    LEGAL_CACHE_SIZE = 512
+    
     def __init__(self, fen: str = None):
         """
         Initialize a new chess game, optionally from a FEN position.
@@ -23,13 +63,50 @@ class ChessGame:
             fen: Optional Forsyth-Edwards Notation string to initialize the board
         """
         self.board = chess.Board(fen) if fen else chess.Board()
-        self.move_history = []
+        # Moves played, packed into 16 bits each by _encode_move
+        self.move_history = array.array('H')
         self.start_time = datetime.datetime.now()
         self.end_time = None
         self.game_result = None
         self.white_player = "Human"
         self.black_player = "AI"
         self.difficulty = "Medium"  # Default AI difficulty
+        # Position key -> (set of legal moves, legal moves in UCI format,
+        # destination squares by origin square)
+        self._legal_cache = OrderedDict()
+        # Outcome of the current position, None while the game goes on
+        self._outcome = self._compute_outcome()
+        # FEN of the current position, built on first use after each move
+        self._fen = None
+    
+    def _get_legal_move_cache(self) -> Tuple[Set[chess.Move], List[str], Dict[chess.Square, FrozenSet[chess.Square]]]:
+        """
+        Get the legal moves of the current position, generating them only
+        the first time the position is seen.
+        
+        Returns:
+            Tuple: Legal moves as a set, as a list in UCI format, and as
+            the destination squares of every origin square
+        """
+        key = self.board._transposition_key()
+        entry = self._legal_cache.get(key)
+        if entry is not None:
+            self._legal_cache.move_to_end(key)
+            return entry
+        
+        moves = list(self.board.generate_legal_moves())
+        destinations = {}
+        for move in moves:
+            destinations.setdefault(move.from_square, set()).add(move.to_square)
+        entry = (
+            set(moves),
+            [move.uci() for move in moves],
+            {square: frozenset(targets) for square, targets in destinations.items()},
+        )
+        self._legal_cache[key] = entry
+        if len(self._legal_cache) > self.LEGAL_CACHE_SIZE:
+            self._legal_cache.popitem(last=False)
+        return entry
     
     def make_move(self, move_uci: str) -> bool:
         """
@@ -43,35 +120,81 @@ class ChessGame:
         """
         try:
             move = chess.Move.from_uci(move_uci)
-            if move in self.board.legal_moves:
-                self.board.push(move)
-                self.move_history.append(move_uci)
-                self._check_game_end()
-                return True
-            return False
         except ValueError:
             return False
+        return self.make_move_obj(move)
+    
+    def make_move_obj(self, move: chess.Move) -> bool:
+        """
+        Make a move on the chess board.
+        
+        Args:
+            move: Move to make
+            
+        Returns:
+            bool: True if the move was valid and made, False otherwise
+        """
+        legal_moves, _, _ = self._get_legal_move_cache()
+        if move not in legal_moves:
+            return False
+        self.board.push(move)
+        self._fen = None
+        self.move_history.append(_encode_move(move))
+        self._check_game_end()
+        return True
+    
+    @property
+    def move_history_uci(self) -> List[str]:
+        """
+        Get the moves played so far.
+        
+        Returns:
+            List[str]: Moves in UCI format
+        """
+        return [_decode_move(code).uci() for code in self.move_history]
+    
+    def _compute_outcome(self) -> Optional[chess.Outcome]:
+        """
+        Determine whether the current position ends the game, generating
+        the legal moves at most once.
+        
+        Returns:
+            Optional[chess.Outcome]: Outcome of the game, or None if it is not over
+        """
+        legal_moves, _, _ = self._get_legal_move_cache()
+        if not legal_moves:
+            if self.board.is_check():
+                return chess.Outcome(chess.Termination.CHECKMATE, not self.board.turn)
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if self.board.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+        if self.board.is_seventyfive_moves():
+            return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self.board.is_fivefold_repetition():
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        return None
     
     def _check_game_end(self) -> None:
         """
         Check if the game has ended and update the game result.
         """
-        if self.board.is_checkmate():
-            self.game_result = "checkmate"
-            self.end_time = datetime.datetime.now()
-        elif self.board.is_stalemate():
-            self.game_result = "stalemate"
-            self.end_time = datetime.datetime.now()
-        elif self.board.is_insufficient_material():
-            self.game_result = "insufficient_material"
-            self.end_time = datetime.datetime.now()
-        elif self.board.is_seventyfive_moves():
-            self.game_result = "seventyfive_moves"
-            self.end_time = datetime.datetime.now()
-        elif self.board.is_fivefold_repetition():
-            self.game_result = "fivefold_repetition"
+        self._outcome = self._compute_outcome()
+        if self._outcome is not None:
+            # "checkmate", "stalemate", "insufficient_material", ...
+            self.game_result = self._outcome.termination.name.lower()
             self.end_time = datetime.datetime.now()
     
+    def fen(self) -> str:
+        """
+        Get the FEN of the current position.
+        
+        Returns:
+            str: Forsyth-Edwards Notation of the board
+        """
+        if self._fen is None:
+            self._fen = self.board.fen()
+        return self._fen
+    
     def get_legal_moves(self) -> List[str]:
         """
         Get all legal moves in the current position.
@@ -79,7 +202,22 @@ class ChessGame:
         Returns:
             List[str]: List of legal moves in UCI format
         """
-        return [move.uci() for move in self.board.legal_moves]
+        _, legal_uci, _ = self._get_legal_move_cache()
+        return list(legal_uci)
+    
+    def get_legal_destinations(self, square: chess.Square) -> FrozenSet[chess.Square]:
+        """
+        Get the squares the piece on a square can legally move to.
+        
+        Args:
+            square: The square containing the piece to move
+            
+        Returns:
+            FrozenSet[chess.Square]: Destination squares, empty if the piece
+            cannot move or the square is empty
+        """
+        _, _, destinations = self._get_legal_move_cache()
+        return destinations.get(square, frozenset())
     
     def is_game_over(self) -> bool:
         """
@@ -88,7 +226,7 @@ class ChessGame:
         Returns:
             bool: True if the game is over, False otherwise
         """
-        return self.board.is_game_over()
+        return self._outcome is not None
     
     def get_winner(self) -> Optional[str]:
         """
@@ -97,17 +235,10 @@ class ChessGame:
         Returns:
             str: "white", "black", or None if draw or game not over
         """
-        if not self.is_game_over():
-            return None
-        
-        outcome = self.board.outcome()
-        if outcome is None:
-            return None
-        
-        if outcome.winner is None:
+        if self._outcome is None or self._outcome.winner is None:
             return None
         
-        return "white" if outcome.winner else "black"
+        return "white" if self._outcome.winner else "black"
     
     def get_game_state(self) -> Dict:
         """
@@ -116,6 +247,7 @@ class ChessGame:
         Returns:
             Dict: Dictionary containing the game state
         """
+        termination = self._outcome.termination if self._outcome else None
         winner = self.get_winner()
         winner_name = None
         if winner == "white":
@@ -124,8 +256,8 @@ class ChessGame:
             winner_name = self.black_player
         
         return {
-            "fen": self.board.fen(),
-            "moves": self.move_history,
+            "fen": self.fen(),
+            "moves": self.move_history_uci,
             "is_game_over": self.is_game_over(),
             "result": self.game_result,
             "winner": winner_name,
@@ -134,8 +266,8 @@ class ChessGame:
             "black_player": self.black_player,
             "difficulty": self.difficulty,
             "check": self.board.is_check(),
-            "checkmate": self.board.is_checkmate(),
-            "stalemate": self.board.is_stalemate(),
+            "checkmate": termination == chess.Termination.CHECKMATE,
+            "stalemate": termination == chess.Termination.STALEMATE,
             "insufficient_material": self.board.is_insufficient_material(),
         }
     
@@ -147,8 +279,8 @@ class ChessGame:
             filepath: Path where to save the game state
         """
         game_data = {
-            "fen": self.board.fen(),
-            "moves": self.move_history,
+            "fen": self.fen(),
+            "moves": self.move_history_uci,
             "start_time": self.start_time.isoformat(),
             "end_time": self.end_time.isoformat() if self.end_time else None,
             "game_result": self.game_result,
@@ -157,9 +289,16 @@ class ChessGame:
             "difficulty": self.difficulty,
         }
         
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(game_data, f, indent=4)
+        directory = os.path.dirname(filepath)
+        if directory not in _ensured_dirs:
+            os.makedirs(directory, exist_ok=True)
+            _ensured_dirs.add(directory)
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(game_data))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(game_data, f, separators=(',', ':'))
     
     @classmethod
     def load_game(cls, filepath: str) -> 'ChessGame':
@@ -172,11 +311,15 @@ class ChessGame:
         Returns:
             ChessGame: Loaded game instance
         """
-        with open(filepath, 'r') as f:
-            game_data = json.load(f)
+        if orjson is not None:
+            with open(filepath, 'rb') as f:
+                game_data = orjson.loads(f.read())
+        else:
+            with open(filepath, 'r') as f:
+                game_data = json.load(f)
         
         game = cls(fen=game_data["fen"])
-        game.move_history = game_data["moves"]
+        game.move_history = array.array('H', (_encode_move(chess.Move.from_uci(uci)) for uci in game_data["moves"]))
         game.start_time = datetime.datetime.fromisoformat(game_data["start_time"])
         game.end_time = datetime.datetime.fromisoformat(game_data["end_time"]) if game_data["end_time"] else None
         game.game_result = game_data["game_result"]
@@ -6,14 +6,38 @@ import pygame
 import chess
 import os
 import sys
-import json
+import queue
+import threading
 import requests
 import datetime
 import time
-from typing import Tuple, List, Dict
+import json
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple, Dict, FrozenSet, Optional
 from chess_app.game.chess_game import ChessGame
 from chess_app.ai.chess_ai import ChessAI
 
+try:
+    import orjson
+except ImportError:  # Optional faster JSON serializer
+    orjson = None
+
+# Connection and read timeouts in seconds for requests to the web server
+HTTP_TIMEOUT = (3, 10)
+
+# Session shared by all requests, so connections to the server are reused
+_http = requests.Session()
+_http.mount('http://', requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+_http.headers.update({'Content-Type': 'application/json'})
+
+
+def _dumps(data: dict) -> bytes:
+    """Serialize a request body to compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
 
 class GameWindow:
     """
@@ -32,10 +56,31 @@ class GameWindow:
     BOARD_SIZE = 512  # Total board size in pixels
     SQUARE_SIZE = BOARD_SIZE // 8  # Size of each square
     
+    # The game loop sleeps until an event arrives; worker threads post these
+    # events to wake it when the AI has a move or a request has finished
+    AI_MOVE_READY = pygame.USEREVENT
+    NETWORK_RESULT_READY = pygame.USEREVENT + 1
+    
+    # Longest sleep of the game loop in milliseconds, and its frame rate cap
+    IDLE_TIMEOUT_MS = 500
+    MAX_FPS = 60
+    
+    # Number of rendered text surfaces kept for reuse
+    TEXT_CACHE_SIZE = 64
+    
     # Piece images directory
     PIECES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 
                              "assets", "pieces")
     
+    # All piece images in one file, side by side in PIECE_SYMBOLS order. The
+    # name changes whenever the way the pieces are scaled does, so atlases
+    # built by older versions are not reused
+    PIECE_ATLAS_PATH = os.path.join(PIECES_DIR, "pieces_atlas_smooth.png")
+    PIECE_SYMBOLS = "pnbrqkPNBRQK"
+    
+    # Piece images loaded by the first window, shared by later ones
+    _piece_images_cache: Optional[Dict] = None
+    
     def __init__(self, user_id=None, token=None, difficulty='medium', saved_game_id=None, saved_game_fen=None):
         """
         Initialize the game window and load resources.
@@ -55,6 +100,13 @@ class GameWindow:
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
         pygame.display.set_caption("Chess Game with AI")
         
+        # Only queue the events the main loop handles; mouse motion alone
+        # would otherwise wake it hundreds of times a second
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN,
+                                  pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED,
+                                  self.AI_MOVE_READY, self.NETWORK_RESULT_READY])
+        
         # User authentication data
         self.user_id = user_id
         self.token = token
@@ -65,6 +117,19 @@ class GameWindow:
         self.saved_game_id = saved_game_id
         self.saved_game_fen = saved_game_fen
         
+        # Network requests run on worker threads; their results are applied
+        # by the main loop: (callback, result, error)
+        self._network_executor = ThreadPoolExecutor(max_workers=2)
+        self._network_results = queue.Queue()
+        # Held while the token is re-validated, so requests running at the
+        # same time share one refresh instead of each sending their own
+        self._auth_refresh_lock = threading.Lock()
+        
+        # Result of a game that ended before authentication finished, to be
+        # recorded once it succeeds
+        self._auth_pending = False
+        self._unrecorded_result = None
+        
         # Verify authentication and get user data if token is provided
         if user_id is not None and token is not None:
             self._verify_authentication()
@@ -75,8 +140,8 @@ class GameWindow:
         os.makedirs(self.assets_dir, exist_ok=True)
         os.makedirs(self.PIECES_DIR, exist_ok=True)
         
-        # Force piece recreation to ensure distinct colors
-        self._recreate_piece_images()
+        # Piece images are shared by all windows of the process
+        self.piece_images = self._get_piece_images(self.screen)
         
         # Set the difficulty
         self.difficulty = difficulty.capitalize()
@@ -90,9 +155,22 @@ class GameWindow:
         
         self.ai = ChessAI(difficulty.lower())  # Set AI difficulty
         
+        # The AI searches on a worker thread so the window keeps responding
+        self._ai_executor = ThreadPoolExecutor(max_workers=1)
+        self._ai_future: Optional[Future] = None
+        # Set to stop the running search and drop its result
+        self._ai_cancel: Optional[threading.Event] = None
+        # Most recently submitted search, still tracked after its move is
+        # discarded; the AI's settings may only change once it has finished
+        self._ai_last_search: Optional[Future] = None
+        # Difficulty chosen while a search was running, applied once it ends
+        self._pending_difficulty: Optional[str] = None
+        
         # UI state variables
         self.selected_square = None
-        self.valid_moves = []
+        self.valid_moves: FrozenSet[chess.Square] = frozenset()
+        # Bitboard of the valid move destinations, for drawing the highlights
+        self._valid_mask = 0
         self.is_player_turn = self.chess_game.board.turn == chess.WHITE  # White (human) starts
         self.is_game_over = self.chess_game.is_game_over()
         
@@ -109,6 +187,39 @@ class GameWindow:
         # Font for text
         self.font = pygame.font.SysFont("Arial", 24)
         self.small_font = pygame.font.SysFont("Arial", 16)
+        # (text, font) -> rendered surface, least recently used first
+        self._text_cache = OrderedDict()
+        
+        # Top-left corner of the board, which is centred in the window
+        self._board_offset_x = (self.screen_width - self.BOARD_SIZE) // 2
+        self._board_offset_y = (self.screen_height - self.BOARD_SIZE) // 2
+        
+        # Pre-render the board background and highlight overlays
+        self._create_board_surfaces()
+        
+        # Screen areas that change between frames: the board, and the status
+        # line above it with the message, difficulty and user name
+        board_offset_x = self._board_offset_x
+        board_offset_y = self._board_offset_y
+        self._board_rect = pygame.Rect(board_offset_x, board_offset_y, self.BOARD_SIZE, self.BOARD_SIZE)
+        self._status_rect = pygame.Rect(0, 0, self.screen_width, board_offset_y)
+        
+        # The board layout never changes: the screen position of every
+        # square, indexed by chess.Square, and the square shown at every
+        # displayed row and column
+        self._square_xy = tuple(
+            (board_offset_x + chess.square_file(square) * self.SQUARE_SIZE,
+             board_offset_y + (7 - chess.square_rank(square)) * self.SQUARE_SIZE)
+            for square in chess.SQUARES
+        )
+        self._square_grid = tuple(
+            tuple(chess.square(col, 7 - row) for col in range(8))
+            for row in range(8)
+        )
+        
+        # Areas to push to the display on the next frame
+        self._dirty_rects = []
+        self._needs_full_redraw = True
         
         # Clock for controlling frame rate
         self.clock = pygame.time.Clock()
@@ -119,71 +230,213 @@ class GameWindow:
             pass
     
     def _verify_authentication(self):
-        """Verify user authentication with the server."""
-        try:
-            response = requests.post('http://localhost:5000/api/auth', 
-                                    json={'token': self.token},
-                                    headers={'Content-Type': 'application/json'})
-            
-            if response.status_code == 200:
+        """Verify user authentication with the server in the background."""
+        def request():
+            return _http.post('http://localhost:5000/api/auth', 
+                              json={'token': self.token},
+                              timeout=HTTP_TIMEOUT)
+        
+        def on_done(response, error):
+            self._auth_pending = False
+            if error is not None:
+                self.is_authenticated = False
+                print(f"Error during authentication: {error}")
+                self.message = f"Connection error. Check server: {str(error)}"
+            elif response.status_code == 200:
                 data = response.json()
                 self.username = data.get('username')
                 self.is_authenticated = True
                 self.auth_time = time.time()  # Store the authentication time
-                self.message = f"Welcome, {self.username}! Your turn (White)"
+                if self.is_player_turn and not self.is_game_over:
+                    self.message = f"Welcome, {self.username}! Your turn (White)"
                 print(f"Authenticated as user: {self.username} (ID: {self.user_id})")
+                if self._unrecorded_result is not None:
+                    self._record_game_to_account(self._unrecorded_result)
             else:
                 self.is_authenticated = False
                 print(f"Authentication failed: {response.text}")
                 self.message = "Authentication failed. Please restart the game."
-        except Exception as e:
-            self.is_authenticated = False
-            print(f"Error during authentication: {e}")
-            self.message = f"Connection error. Check server: {str(e)}"
+            self._unrecorded_result = None
+        
+        self._auth_pending = True
+        self._run_in_background(request, on_done)
     
-    def _load_piece_images(self) -> Dict:
+    def _run_in_background(self, request, on_done):
         """
-        Load chess piece images from the assets directory.
+        Run a blocking network request on a worker thread so the game loop
+        keeps drawing and handling input while it is in flight.
         
+        Args:
+            request: Function making the request and returning its result
+            on_done: Called on the main thread with the result and the
+                exception raised by the request, or None if it succeeded
+        """
+        def worker():
+            try:
+                result, error = request(), None
+            except Exception as e:
+                result, error = None, e
+            self._network_results.put((on_done, result, error))
+            pygame.event.post(pygame.event.Event(self.NETWORK_RESULT_READY))
+        
+        self._network_executor.submit(worker)
+    
+    def _process_network_results(self):
+        """Apply the results of finished background requests."""
+        while True:
+            try:
+                on_done, result, error = self._network_results.get_nowait()
+            except queue.Empty:
+                return
+            on_done(result, error)
+            # Callbacks report their outcome through the status line
+            self._invalidate(self._status_rect)
+    
+    @classmethod
+    def _get_piece_images(cls, screen: pygame.Surface) -> Dict:
+        """
+        Get the chess piece images, loading them only for the first window.
+        
+        Args:
+            screen: Display surface the images are converted for
+            
+        Returns:
+            Dict: Dictionary mapping piece symbols to their images
+        """
+        if cls._piece_images_cache is None:
+            cls._piece_images_cache = cls._load_piece_images(screen)
+        return cls._piece_images_cache
+    
+    @classmethod
+    def _load_piece_images(cls, screen: pygame.Surface) -> Dict:
+        """
+        Load chess piece images from the piece atlas, building the atlas
+        from the individual piece images if it is missing or out of date.
+        
+        Args:
+            screen: Display surface the images are converted for
+            
         Returns:
             Dict: Dictionary mapping piece symbols to their images
         """
-        pieces = {}
-        piece_symbols = ['p', 'n', 'b', 'r', 'q', 'k', 'P', 'N', 'B', 'R', 'Q', 'K']
+        atlas_size = (len(cls.PIECE_SYMBOLS) * cls.SQUARE_SIZE, cls.SQUARE_SIZE)
+        atlas = None
+        if cls._is_piece_atlas_current():
+            try:
+                atlas = pygame.image.load(cls.PIECE_ATLAS_PATH)
+            except pygame.error as e:
+                print(f"Error loading piece atlas: {e}")
+            # Rebuild an atlas made for a different square size
+            if atlas is not None and atlas.get_size() != atlas_size:
+                atlas = None
+        
+        if atlas is None:
+            atlas = cls._build_piece_atlas(atlas_size)
+        
+        # Convert the atlas to the display's pixel format once; the pieces
+        # are views into it, so blits need no per-pixel conversion
+        atlas = atlas.convert_alpha(screen)
+        return {
+            symbol: atlas.subsurface((i * cls.SQUARE_SIZE, 0, cls.SQUARE_SIZE, cls.SQUARE_SIZE))
+            for i, symbol in enumerate(cls.PIECE_SYMBOLS)
+        }
+    
+    @classmethod
+    def _piece_image_paths(cls) -> Dict[str, str]:
+        """
+        Get the paths of the individual piece images the atlas is built from.
         
+        Returns:
+            Dict[str, str]: Dictionary mapping piece symbols to image paths
+        """
         # Map from chess notation to image file notation
         # Black pieces: bb, bn, etc. White pieces: wb, wn, etc.
         piece_mapping = {
             'p': 'bp', 'n': 'bn', 'b': 'bb', 'r': 'br', 'q': 'bq', 'k': 'bk',
             'P': 'wp', 'N': 'wn', 'B': 'wb', 'R': 'wr', 'Q': 'wq', 'K': 'wk'
         }
+        return {
+            symbol: os.path.join(cls.PIECES_DIR, f"{piece_mapping[symbol]}.png")
+            for symbol in cls.PIECE_SYMBOLS
+        }
+    
+    @classmethod
+    def _is_piece_atlas_current(cls) -> bool:
+        """
+        Check whether the saved atlas is at least as new as every piece image.
+        
+        Returns:
+            bool: True if the atlas exists and no piece image changed after it
+        """
+        try:
+            atlas_mtime = os.path.getmtime(cls.PIECE_ATLAS_PATH)
+        except OSError:
+            return False
+        
+        # Compare against each image rather than the directory, whose time
+        # does not change when an existing image is overwritten in place
+        for image_path in cls._piece_image_paths().values():
+            try:
+                if os.path.getmtime(image_path) > atlas_mtime:
+                    return False
+            except OSError:
+                # A missing image only matters if the atlas has to be rebuilt
+                pass
+        return True
+    
+    @classmethod
+    def _build_piece_atlas(cls, atlas_size: Tuple[int, int]) -> pygame.Surface:
+        """
+        Combine the individual piece images into one atlas image and save it.
+        
+        Args:
+            atlas_size: Size of the atlas in pixels
+            
+        Returns:
+            pygame.Surface: Atlas with the scaled pieces side by side
+        """
+        atlas = pygame.Surface(atlas_size, pygame.SRCALPHA)
+        image_paths = cls._piece_image_paths()
         
         # Load each piece image
-        for symbol in piece_symbols:
-            image_path = os.path.join(self.PIECES_DIR, f"{piece_mapping[symbol]}.png")
+        for i, symbol in enumerate(cls.PIECE_SYMBOLS):
+            image_path = image_paths[symbol]
             try:
                 # Load the image
                 image = pygame.image.load(image_path)
-                # Scale the image to fit the square
-                pieces[symbol] = pygame.transform.scale(image, (self.SQUARE_SIZE, self.SQUARE_SIZE))
+                # Scale the image to fit the square, filtered since this is
+                # only done when the atlas is built
+                image = pygame.transform.smoothscale(image, (cls.SQUARE_SIZE, cls.SQUARE_SIZE))
             except Exception as e:
                 print(f"Error loading image for {symbol}: {e}")
                 # If there's an error, we'll raise it so it's visible to the user
                 raise ValueError(f"Failed to load chess piece image: {image_path}")
+            
+            # Copy the pixels unblended onto the transparent atlas
+            atlas.blit(image, (i * cls.SQUARE_SIZE, 0), special_flags=pygame.BLEND_RGBA_MAX)
         
-        return pieces
+        try:
+            pygame.image.save(atlas, cls.PIECE_ATLAS_PATH)
+        except pygame.error as e:
+            print(f"Error saving piece atlas: {e}")
+        
+        return atlas
     
-    def _recreate_piece_images(self):
-        """Reload all piece images."""
-        # Directly reload the pieces
-        self.piece_images = self._load_piece_images()
+    def _invalidate(self, *rects: pygame.Rect):
+        """
+        Mark screen areas to be redrawn on the next frame.
+        
+        Args:
+            rects: Areas that changed; the whole screen if none are given
+        """
+        if rects:
+            self._dirty_rects.extend(rects)
+        else:
+            self._needs_full_redraw = True
     
     def _draw(self):
         """Draw the game screen."""
-        # Fill the background
-        self.screen.fill((240, 240, 240))
-        
-        # Draw the chess board
+        # Draw the background and the chess board
         self._draw_board()
         
         # Draw the pieces
@@ -192,42 +445,33 @@ class GameWindow:
         # Draw the UI elements
         self._draw_ui()
         
-        # Update the display
-        pygame.display.flip()
+        # Update only the parts of the display that changed
+        if self._needs_full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._dirty_rects)
+        self._dirty_rects = []
+        self._needs_full_redraw = False
     
-    def _draw_board(self):
-        """Draw the chess board with square highlighting."""
-        board_offset_x = (self.screen_width - self.BOARD_SIZE) // 2
-        board_offset_y = (self.screen_height - self.BOARD_SIZE) // 2
-        
-        # Draw the squares
+    def _create_board_surfaces(self):
+        """Render the static parts of the screen and the highlight overlays once."""
+        board_offset_x = self._board_offset_x
+        board_offset_y = self._board_offset_y
+        
+        # Background with the squares and coordinates, which never change
+        self._background = pygame.Surface((self.screen_width, self.screen_height)).convert(self.screen)
+        self._background.fill((240, 240, 240))
+        
+        # Draw the squares: build the two alternating rows once and stack them
+        rows = []
+        for first_dark in (False, True):
+            row_surface = pygame.Surface((self.BOARD_SIZE, self.SQUARE_SIZE))
+            row_surface.fill(self.LIGHT_SQUARE)
+            for col in range(int(not first_dark), 8, 2):
+                row_surface.fill(self.DARK_SQUARE, (col * self.SQUARE_SIZE, 0, self.SQUARE_SIZE, self.SQUARE_SIZE))
+            rows.append(row_surface)
         for row in range(8):
-            for col in range(8):
-                x = board_offset_x + col * self.SQUARE_SIZE
-                y = board_offset_y + row * self.SQUARE_SIZE
-                
-                # Determine square color
-                color = self.LIGHT_SQUARE if (row + col) % 2 == 0 else self.DARK_SQUARE
-                
-                # Draw the square
-                pygame.draw.rect(self.screen, color, (x, y, self.SQUARE_SIZE, self.SQUARE_SIZE))
-                
-                # Highlight selected square
-                square = chess.square(col, 7 - row)  # Convert to chess.Square
-                if square == self.selected_square:
-                    highlight = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
-                    highlight.fill(self.HIGHLIGHT)
-                    self.screen.blit(highlight, (x, y))
-                
-                # Highlight valid moves
-                if square in self.valid_moves:
-                    highlight = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
-                    highlight.fill(self.MOVE_HIGHLIGHT)
-                    self.screen.blit(highlight, (x, y))
-        
-        # Draw the board border
-        pygame.draw.rect(self.screen, self.BLACK, 
-                         (board_offset_x, board_offset_y, self.BOARD_SIZE, self.BOARD_SIZE), 2)
+            self._background.blit(rows[row % 2], (board_offset_x, board_offset_y + row * self.SQUARE_SIZE))
         
         # Draw the coordinates
         for i in range(8):
@@ -235,54 +479,94 @@ class GameWindow:
             file_label = self.small_font.render(chess.FILE_NAMES[i], True, self.BLACK)
             x = board_offset_x + i * self.SQUARE_SIZE + self.SQUARE_SIZE // 2 - file_label.get_width() // 2
             y = board_offset_y + self.BOARD_SIZE + 5
-            self.screen.blit(file_label, (x, y))
+            self._background.blit(file_label, (x, y))
             
             # Draw rank labels (1-8)
             rank_label = self.small_font.render(str(8 - i), True, self.BLACK)
             x = board_offset_x - 15
             y = board_offset_y + i * self.SQUARE_SIZE + self.SQUARE_SIZE // 2 - rank_label.get_height() // 2
-            self.screen.blit(rank_label, (x, y))
+            self._background.blit(rank_label, (x, y))
+        
+        # Translucent overlays reused for every highlighted square
+        self._selected_highlight = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA).convert_alpha(self.screen)
+        self._selected_highlight.fill(self.HIGHLIGHT)
+        self._move_highlight = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA).convert_alpha(self.screen)
+        self._move_highlight.fill(self.MOVE_HIGHLIGHT)
+    
+    def _draw_board(self):
+        """Draw the chess board with square highlighting."""
+        # Bind the lookups used in the loop to locals
+        blit = self.screen.blit
+        square_xy = self._square_xy
+        
+        # Draw the pre-rendered squares and coordinates
+        blit(self._background, (0, 0))
+        
+        # Highlight selected square
+        if self.selected_square is not None:
+            blit(self._selected_highlight, square_xy[self.selected_square])
+        
+        # Highlight valid moves
+        move_highlight = self._move_highlight
+        for square in chess.scan_forward(self._valid_mask):
+            blit(move_highlight, square_xy[square])
+        
+        # Draw the board border
+        pygame.draw.rect(self.screen, self.BLACK, self._board_rect, 2)
     
     def _draw_pieces(self):
         """Draw the chess pieces on the board."""
-        board_offset_x = (self.screen_width - self.BOARD_SIZE) // 2
-        board_offset_y = (self.screen_height - self.BOARD_SIZE) // 2
-        
-        for square in chess.SQUARES:
-            piece = self.chess_game.board.piece_at(square)
-            if piece:
-                # Get the piece image
-                symbol = piece.symbol()
-                image = self.piece_images[symbol]
-                
-                # Calculate the position
-                file_idx = chess.square_file(square)
-                rank_idx = 7 - chess.square_rank(square)  # Flip the rank for display
-                
-                x = board_offset_x + file_idx * self.SQUARE_SIZE
-                y = board_offset_y + rank_idx * self.SQUARE_SIZE
-                
-                # Draw the piece
-                self.screen.blit(image, (x, y))
+        # Bind the lookups used in the loop to locals
+        blit = self.screen.blit
+        piece_images = self.piece_images
+        square_xy = self._square_xy
+        
+        # Visit only the occupied squares
+        for square, piece in self.chess_game.board.piece_map().items():
+            # Draw the piece
+            blit(piece_images[piece.symbol()], square_xy[square])
+    
+    def _render_text(self, text: str, font: pygame.font.Font) -> pygame.Surface:
+        """
+        Render black text, reusing the surface if the same text was rendered recently.
+        
+        Args:
+            text: Text to render
+            font: Font to render the text with
+            
+        Returns:
+            pygame.Surface: Rendered text
+        """
+        key = (text, id(font))
+        surface = self._text_cache.get(key)
+        if surface is not None:
+            self._text_cache.move_to_end(key)
+            return surface
+        
+        surface = font.render(text, True, self.BLACK).convert_alpha(self.screen)
+        self._text_cache[key] = surface
+        if len(self._text_cache) > self.TEXT_CACHE_SIZE:
+            self._text_cache.popitem(last=False)
+        return surface
     
     def _draw_ui(self):
         """Draw the UI elements."""
         # Draw message text
-        message_text = self.font.render(self.message, True, self.BLACK)
+        message_text = self._render_text(self.message, self.font)
         message_rect = message_text.get_rect(center=(self.screen_width // 2, 30))
         self.screen.blit(message_text, message_rect)
         
         # Draw difficulty text
-        difficulty_text = self.small_font.render(f"Difficulty: {self.difficulty}", True, self.BLACK)
+        difficulty_text = self._render_text(f"Difficulty: {self.difficulty}", self.small_font)
         self.screen.blit(difficulty_text, (20, 20))
         
         # Draw user information if authenticated
         if self.is_authenticated:
-            user_text = self.small_font.render(f"User: {self.username}", True, self.BLACK)
+            user_text = self._render_text(f"User: {self.username}", self.small_font)
             self.screen.blit(user_text, (self.screen_width - user_text.get_width() - 20, 20))
         
         # Draw help text
-        help_text = self.small_font.render("Press R to reset, 1-3 to change difficulty, S to save, L to load", True, self.BLACK)
+        help_text = self._render_text("Press R to reset, 1-3 to change difficulty, S to save, L to load", self.small_font)
         help_rect = help_text.get_rect(center=(self.screen_width // 2, self.screen_height - 20))
         self.screen.blit(help_text, help_rect)
     
@@ -293,39 +577,32 @@ class GameWindow:
         Args:
             pos: Mouse position (x, y)
         """
-        # Calculate board offset
-        board_offset_x = (self.screen_width - self.BOARD_SIZE) // 2
-        board_offset_y = (self.screen_height - self.BOARD_SIZE) // 2
+        self._invalidate(self._board_rect, self._status_rect)
         
         # Check if the click is within the board
-        if (board_offset_x <= pos[0] <= board_offset_x + self.BOARD_SIZE and
-            board_offset_y <= pos[1] <= board_offset_y + self.BOARD_SIZE):
+        if self._board_rect.collidepoint(pos):
             
             # Calculate the square that was clicked
-            file_idx = (pos[0] - board_offset_x) // self.SQUARE_SIZE
-            rank_idx = (pos[1] - board_offset_y) // self.SQUARE_SIZE
+            file_idx = (pos[0] - self._board_offset_x) // self.SQUARE_SIZE
+            rank_idx = (pos[1] - self._board_offset_y) // self.SQUARE_SIZE
             
             # Convert to chess.Square
-            square = chess.square(file_idx, 7 - rank_idx)
+            square = self._square_grid[rank_idx][file_idx]
+            board = self.chess_game.board
             
             # If a square is already selected
             if self.selected_square is not None:
                 # Check if the clicked square is a valid move
                 if square in self.valid_moves:
-                    # Make the move
-                    move = chess.Move(self.selected_square, square)
-                    
-                    # Check for promotion
-                    if self.chess_game.board.piece_at(self.selected_square).piece_type == chess.PAWN:
-                        if 7 - rank_idx == 0:  # White pawn reaching the 8th rank
-                            move = chess.Move(self.selected_square, square, promotion=chess.QUEEN)
-                    
-                    # Make the move in UCI format
-                    self.chess_game.make_move(move.uci())
+                    # Make the move, promoting to a queen when a white pawn
+                    # reaches the 8th rank (the top row of the display)
+                    promotion = None
+                    if rank_idx == 0 and board.piece_type_at(self.selected_square) == chess.PAWN:
+                        promotion = chess.QUEEN
+                    self.chess_game.make_move_obj(chess.Move(self.selected_square, square, promotion=promotion))
                     
                     # Reset selection
-                    self.selected_square = None
-                    self.valid_moves = []
+                    self._select_square(None)
                     
                     # Check if the game is over
                     if self.chess_game.is_game_over():
@@ -335,25 +612,30 @@ class GameWindow:
                         # Switch to AI's turn
                         self.is_player_turn = False
                         self.message = "AI is thinking..."
+                elif board.color_at(square) == chess.WHITE:
+                    # The clicked square is not a valid move but has a piece of the player's color
+                    self._select_square(square)
                 else:
-                    # If the clicked square is not a valid move, check if it has a piece of the player's color
-                    piece = self.chess_game.board.piece_at(square)
-                    if piece and piece.color == chess.WHITE:
-                        # Select the new square
-                        self.selected_square = square
-                        self.valid_moves = self._get_valid_moves(square)
-                    else:
-                        # Deselect
-                        self.selected_square = None
-                        self.valid_moves = []
-            else:
+                    # Deselect
+                    self._select_square(None)
+            elif board.color_at(square) == chess.WHITE:
                 # If no square is selected, select the clicked square if it has a piece of the player's color
-                piece = self.chess_game.board.piece_at(square)
-                if piece and piece.color == chess.WHITE:
-                    self.selected_square = square
-                    self.valid_moves = self._get_valid_moves(square)
+                self._select_square(square)
     
-    def _get_valid_moves(self, square: chess.Square) -> List[chess.Square]:
+    def _select_square(self, square: Optional[chess.Square]):
+        """
+        Select a square and find the moves of its piece.
+        
+        Args:
+            square: The square to select, or None to clear the selection
+        """
+        self.selected_square = square
+        self.valid_moves = self._get_valid_moves(square) if square is not None else frozenset()
+        self._valid_mask = 0
+        for target in self.valid_moves:
+            self._valid_mask |= chess.BB_SQUARES[target]
+    
+    def _get_valid_moves(self, square: chess.Square) -> FrozenSet[chess.Square]:
         """
         Get valid destination squares for a piece.
         
@@ -361,24 +643,63 @@ class GameWindow:
             square: The square containing the piece to move
             
         Returns:
-            List[chess.Square]: List of valid destination squares
+            FrozenSet[chess.Square]: Set of valid destination squares
         """
-        valid_squares = []
-        
-        for move in self.chess_game.board.legal_moves:
-            if move.from_square == square:
-                valid_squares.append(move.to_square)
+        # Looked up in the legal moves the game keeps per position
+        return self.chess_game.get_legal_destinations(square)
+    
+    def _start_ai_move(self):
+        """Start searching for the AI's move on the worker thread."""
+        # The search gets its own copy, detached from the game's move stack
+        board = self.chess_game.board.copy(stack=False)
+        cancel = threading.Event()
+        self._ai_cancel = cancel
+        self._ai_future = self._ai_executor.submit(self.ai.get_best_move, board, cancel)
+        self._ai_last_search = self._ai_future
+        # A cancelled search belongs to a discarded game or a closing window
+        self._ai_future.add_done_callback(
+            lambda future: None if cancel.is_set() else pygame.event.post(pygame.event.Event(self.AI_MOVE_READY)))
+    
+    def _cancel_ai_move(self):
+        """Stop the running AI search, if any, and discard its move."""
+        if self._ai_cancel is not None:
+            self._ai_cancel.set()
+            self._ai_cancel = None
+        self._ai_future = None
+    
+    def _set_ai_difficulty(self, difficulty):
+        """
+        Change the AI difficulty, waiting for a running search to finish first.
         
-        return valid_squares
+        Args:
+            difficulty: Difficulty level ("easy", "medium", "hard")
+        """
+        self._pending_difficulty = difficulty
+        self._apply_pending_difficulty()
+    
+    def _apply_pending_difficulty(self):
+        """Apply a pending difficulty change once no search is using the AI."""
+        # A search reads the depth, evaluation settings and transposition
+        # table that set_difficulty replaces
+        if self._pending_difficulty is None:
+            return
+        if self._ai_last_search is not None and not self._ai_last_search.done():
+            return
+        self.ai.set_difficulty(self._pending_difficulty)
+        self._pending_difficulty = None
     
     def _make_ai_move(self):
-        """Make a move for the AI."""
+        """Make the move found by the finished AI search."""
+        self._invalidate(self._board_rect, self._status_rect)
+        
         # Get the best move from the AI
-        ai_move = self.ai.get_best_move(self.chess_game.board)
+        ai_move = self._ai_future.result()
+        self._ai_future = None
+        self._ai_cancel = None
         
         if ai_move:
             # Make the move
-            self.chess_game.make_move(ai_move.uci())
+            self.chess_game.make_move_obj(ai_move)
             
             # Check if the game is over
             if self.chess_game.is_game_over():
@@ -391,9 +712,12 @@ class GameWindow:
     
     def _reset_game(self):
         """Reset the game to the initial state."""
+        self._invalidate(self._board_rect, self._status_rect)
+        # Stop a search still running for the old game, so the worker is
+        # free for the new one
+        self._cancel_ai_move()
         self.chess_game = ChessGame()
-        self.selected_square = None
-        self.valid_moves = []
+        self._select_square(None)
         self.is_player_turn = True
         self.is_game_over = False
         self.message = "Your turn (White)"
@@ -420,10 +744,12 @@ class GameWindow:
         # Record the game to the user's account if authenticated
         if self.is_authenticated:
             self._record_game_to_account(result)
+        elif self._auth_pending:
+            self._unrecorded_result = result
     
     def _record_game_to_account(self, result):
         """
-        Record the completed game to the user's account.
+        Record the completed game to the user's account in the background.
         
         Args:
             result: Game result ('win', 'loss', 'draw')
@@ -432,45 +758,39 @@ class GameWindow:
             self.message = "Not logged in. Game not recorded."
             return
         
-        # Refresh token if needed
-        if not self._refresh_token_if_needed():
-            self.message = "Authentication expired. Game not recorded."
-            return
-            
-        try:
-            # Ensure moves is a properly formatted list
-            moves = self.chess_game.move_history
-            if not isinstance(moves, list):
-                # If it's not a list, try to convert it
-                if isinstance(moves, str):
-                    try:
-                        # Try to parse JSON
-                        parsed_moves = json.loads(moves)
-                        moves = parsed_moves
-                    except json.JSONDecodeError:
-                        # If not valid JSON, split by comma
-                        moves = moves.split(',')
-                else:
-                    # Fallback to empty list
-                    moves = []
-                    
-            # Prepare game data
-            game_data = {
-                'result': result,
-                'difficulty': self.difficulty.lower(),
-                'moves': moves,
-                'final_fen': self.chess_game.board.fen(),
-                'end_time': datetime.datetime.now().isoformat()
-            }
+        # Prepare game data
+        game_data = {
+            'result': result,
+            'difficulty': self.difficulty.lower(),
+            'moves': self.chess_game.move_history_uci,
+            'final_fen': self.chess_game.fen(),
+            'end_time': datetime.datetime.now().isoformat()
+        }
+        saved_game_id = self.saved_game_id
+        
+        def request():
+            # Refresh token if needed
+            if not self._refresh_token_if_needed():
+                return None
             
             print(f"Sending game record data: {game_data}")
             
             # Send the game data to the API
-            response = requests.post('http://localhost:5000/api/record_game',
-                                    json=game_data,
-                                    headers={'Authorization': f'Bearer {self.token}', 
-                                             'Content-Type': 'application/json'},
-                                    allow_redirects=False)  # Prevent automatic redirects
+            return _http.post('http://localhost:5000/api/record_game',
+                              data=_dumps(game_data),
+                              headers={'Authorization': f'Bearer {self.token}'},
+                              allow_redirects=False,  # Prevent automatic redirects
+                              timeout=HTTP_TIMEOUT)
+        
+        def on_done(response, error):
+            if error is not None:
+                self.message = f"Error recording game: {str(error)}"
+                print(f"Error recording game: {error}")
+                return
+            
+            if response is None:
+                self.message = "Authentication expired. Game not recorded."
+                return
             
             # Check specifically for redirect to login page (302)
             if response.status_code == 302 and 'login' in response.headers.get('Location', ''):
@@ -483,119 +803,125 @@ class GameWindow:
                 print(f"Game recorded successfully: {response.json()}")
                 
                 # If this was a saved game, delete it after completion
-                if self.saved_game_id:
-                    self._delete_saved_game(self.saved_game_id)
+                if saved_game_id:
+                    self._delete_saved_game(saved_game_id)
             else:
                 self.message = f"Failed to record game: {response.text}"
                 print(f"Failed to record game: {response.text}")
-        except Exception as e:
-            self.message = f"Error recording game: {str(e)}"
-            print(f"Error recording game: {e}")
+        
+        self._run_in_background(request, on_done)
             
     def _delete_saved_game(self, saved_game_id):
         """
-        Delete a saved game after it's been completed.
+        Delete a saved game after it's been completed, in the background.
         
         Args:
             saved_game_id: ID of the saved game to delete
         """
         if not self.is_authenticated or not saved_game_id:
             return
-            
-        try:
+        
+        def request():
             # Send a request to delete the saved game
-            response = requests.delete(f'http://localhost:5000/api/delete_saved_game/{saved_game_id}',
-                                     headers={'Authorization': f'Bearer {self.token}'},
-                                     allow_redirects=False)
-            
-            if response.status_code == 200:
+            return _http.delete(f'http://localhost:5000/api/delete_saved_game/{saved_game_id}',
+                                headers={'Authorization': f'Bearer {self.token}'},
+                                allow_redirects=False,
+                                timeout=HTTP_TIMEOUT)
+        
+        def on_done(response, error):
+            if error is not None:
+                print(f"Error deleting saved game: {error}")
+            elif response.status_code == 200:
                 print(f"Saved game {saved_game_id} deleted successfully after completion")
             else:
                 print(f"Failed to delete saved game: {response.text}")
-        except Exception as e:
-            print(f"Error deleting saved game: {e}")
+        
+        self._run_in_background(request, on_done)
     
     def _refresh_token_if_needed(self):
         """
         Check if token might be expiring soon and refresh it.
         Returns True if still authenticated.
+        
+        Called from the worker threads of background requests.
         """
         if not self.is_authenticated:
             return False
             
-        # If we authenticated more than 25 minutes ago, re-validate the token
-        if hasattr(self, 'auth_time') and time.time() - self.auth_time > 1500:  # 25 minutes
-            try:
-                print("Token might expire soon, refreshing authentication...")
-                response = requests.post('http://localhost:5000/api/auth', 
-                                     json={'token': self.token},
-                                     headers={'Content-Type': 'application/json'})
+        with self._auth_refresh_lock:
+            # A refresh that failed while this request waited for the lock
+            if not self.is_authenticated:
+                return False
+            
+            # If we authenticated more than 25 minutes ago, re-validate the token
+            if hasattr(self, 'auth_time') and time.time() - self.auth_time > 1500:  # 25 minutes
+                try:
+                    print("Token might expire soon, refreshing authentication...")
+                    response = _http.post('http://localhost:5000/api/auth', 
+                                      json={'token': self.token},
+                                      timeout=HTTP_TIMEOUT)
                 
-                if response.status_code == 200:
-                    self.auth_time = time.time()  # Update the authentication time
-                    print("Authentication refreshed successfully")
-                    return True
-                else:
+                    if response.status_code == 200:
+                        self.auth_time = time.time()  # Update the authentication time
+                        print("Authentication refreshed successfully")
+                        return True
+                    else:
+                        self.is_authenticated = False
+                        self.message = "Authentication expired. Please restart the game."
+                        print(f"Authentication refresh failed: {response.text}")
+                        return False
+                except Exception as e:
                     self.is_authenticated = False
-                    self.message = "Authentication expired. Please restart the game."
-                    print(f"Authentication refresh failed: {response.text}")
+                    self.message = f"Connection error during refresh: {str(e)}"
+                    print(f"Error refreshing authentication: {e}")
                     return False
-            except Exception as e:
-                self.is_authenticated = False
-                self.message = f"Connection error during refresh: {str(e)}"
-                print(f"Error refreshing authentication: {e}")
-                return False
                 
         return True
     
     def _save_game(self):
-        """Save the current game state."""
+        """Save the current game state in the background."""
         if not self.is_authenticated:
             self.message = "You must be logged in to save games"
             return
-            
-        # Refresh token if needed
-        if not self._refresh_token_if_needed():
-            return
-            
-        try:
-            # Show a dialog to get the save name
-            # In a real implementation, this would be a proper dialog
-            # For now, we'll just use a simple name
-            save_name = f"Game_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            # Ensure moves is a properly formatted list
-            moves = self.chess_game.move_history
-            if not isinstance(moves, list):
-                # If it's not a list, try to convert it
-                if isinstance(moves, str):
-                    try:
-                        # Try to parse JSON
-                        parsed_moves = json.loads(moves)
-                        moves = parsed_moves
-                    except json.JSONDecodeError:
-                        # If not valid JSON, split by comma
-                        moves = moves.split(',')
-                else:
-                    # Fallback to empty list
-                    moves = []
-            
-            # Prepare save data
-            save_data = {
-                'name': save_name,
-                'fen': self.chess_game.board.fen(),
-                'moves': moves,
-                'difficulty': self.difficulty.lower()
-            }
+        
+        # Show a dialog to get the save name
+        # In a real implementation, this would be a proper dialog
+        # For now, we'll just use a simple name
+        save_name = f"Game_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        # Prepare save data; move_history_uci builds a new list, so the
+        # moves are not affected by the game going on while the request is
+        # in flight
+        save_data = {
+            'name': save_name,
+            'fen': self.chess_game.fen(),
+            'moves': self.chess_game.move_history_uci,
+            'difficulty': self.difficulty.lower()
+        }
+        
+        def request():
+            # Refresh token if needed
+            if not self._refresh_token_if_needed():
+                return None
             
             print(f"Sending save data: {save_data}")
             
             # Send the save data to the API
-            response = requests.post('http://localhost:5000/save_game',
-                                    json=save_data,
-                                    headers={'Authorization': f'Bearer {self.token}', 
-                                             'Content-Type': 'application/json'},
-                                    allow_redirects=False)  # Prevent automatic redirects
+            return _http.post('http://localhost:5000/save_game',
+                              data=_dumps(save_data),
+                              headers={'Authorization': f'Bearer {self.token}'},
+                              allow_redirects=False,  # Prevent automatic redirects
+                              timeout=HTTP_TIMEOUT)
+        
+        def on_done(response, error):
+            if error is not None:
+                self.message = f"Error saving game: {str(error)}"
+                print(f"Error saving game: {error}")
+                return
+            
+            # The token refresh failed and already reported why
+            if response is None:
+                return
             
             # Check specifically for redirect to login page (302)
             if response.status_code == 302 and 'login' in response.headers.get('Location', ''):
@@ -610,45 +936,65 @@ class GameWindow:
             else:
                 self.message = f"Failed to save game: {response.text}"
                 print(f"Failed to save game: {response.text}")
-        except Exception as e:
-            self.message = f"Error saving game: {str(e)}"
-            print(f"Error saving game: {e}")
+        
+        self.message = "Saving game..."
+        self._run_in_background(request, on_done)
     
     def run(self):
         """Main game loop."""
         running = True
         
         while running:
+            # Apply the results of finished network requests
+            self._process_network_results()
+            
+            self._apply_pending_difficulty()
+            
             # Handle AI move if it's the AI's turn
             if not self.is_player_turn and not self.is_game_over:
-                self._make_ai_move()
+                if self._ai_future is None:
+                    self._start_ai_move()
+                elif self._ai_future.done():
+                    self._make_ai_move()
+            
+            # Sleep until an event arrives unless there is something to draw
+            if self._needs_full_redraw or self._dirty_rects:
+                events = pygame.event.get()
+            else:
+                event = pygame.event.wait(self.IDLE_TIMEOUT_MS)
+                events = [event] + pygame.event.get() if event.type != pygame.NOEVENT else []
             
             # Process events
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    # The window contents were lost and must be pushed again
+                    self._invalidate()
                 elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     # Left mouse button clicked
                     if not self.is_game_over and self.is_player_turn:
                         self._handle_mouse_click(event.pos)
                 elif event.type == pygame.KEYDOWN:
+                    # Key handlers only change the status line
+                    self._invalidate(self._status_rect)
                     if event.key == pygame.K_r:
                         # Reset the game
                         self._reset_game()
                     elif event.key == pygame.K_1:
                         # Set difficulty to easy
                         self.difficulty = "Easy"
-                        self.ai.set_difficulty("easy")
+                        self._set_ai_difficulty("easy")
                         self.message = f"Difficulty set to {self.difficulty}"
                     elif event.key == pygame.K_2:
                         # Set difficulty to medium
                         self.difficulty = "Medium"
-                        self.ai.set_difficulty("medium")
+                        self._set_ai_difficulty("medium")
                         self.message = f"Difficulty set to {self.difficulty}"
                     elif event.key == pygame.K_3:
                         # Set difficulty to hard
                         self.difficulty = "Hard"
-                        self.ai.set_difficulty("hard")
+                        self._set_ai_difficulty("hard")
                         self.message = f"Difficulty set to {self.difficulty}"
                     elif event.key == pygame.K_s:
                         # Save the game
@@ -660,12 +1006,18 @@ class GameWindow:
                         else:
                             self.message = "You must be logged in to load games"
             
-            # Draw the game
-            self._draw()
+            # Draw the game if anything changed
+            if self._needs_full_redraw or self._dirty_rects:
+                self._draw()
             
             # Cap the frame rate
-            self.clock.tick(60)
+            self.clock.tick(self.MAX_FPS)
         
         # Clean up resources before exiting
+        # The cancelled search returns at its next node; waiting for it keeps
+        # its callback from touching pygame after pygame.quit()
+        self._cancel_ai_move()
+        self._ai_executor.shutdown(wait=True)
+        self._network_executor.shutdown(wait=False)
         pygame.quit()
         sys.exit()
\ No newline at end of file
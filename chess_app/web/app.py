@@ -3,21 +3,191 @@ Flask web application for user management and game statistics.
 """
 
 import os
+import gzip
 import json
+import logging
 import subprocess
-import secrets
-import time
 import sys
+import threading
+import time
 import datetime
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, session
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, session, make_response
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from chess_app.db.models import User
 from chess_app.db import mongo_db
-from chess_app.web.forms import LoginForm, RegistrationForm
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # Optional faster JSON serializer
+    orjson = None
+
+# Number of games shown per game history page
+GAME_HISTORY_PAGE_SIZE = 50
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESS_MIN_SIZE = 500
+COMPRESS_MIMETYPES = {'text/html', 'application/json'}
+
+# Compiled templates are cached here so they survive process restarts. By
+# default Jinja uses a private per-user directory and checks its owner, as
+# cached bytecode is executed when loaded
+JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR')
+
+# Fields the game API endpoints require in their JSON body
+SAVE_GAME_FIELDS = frozenset({'name', 'fen', 'difficulty'})
+RECORD_GAME_FIELDS = frozenset({'result', 'difficulty', 'final_fen'})
+DIFFICULTY_LEVELS = frozenset({'easy', 'medium', 'hard'})
+
+# Main script the Pygame game is launched with
+RUN_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'run.py')
+
+# Failed logins allowed per username and client address within the window
+# (seconds), before further attempts are refused without checking the
+# password hash
+LOGIN_ATTEMPT_LIMIT = 5
+LOGIN_ATTEMPT_WINDOW = 60
+
+# (username, address) -> (window start, failed attempts)
+_failed_logins = {}
+_failed_logins_lock = threading.Lock()
+
+
+def _login_blocked(key):
+    """Check whether a username and address have used up their failed logins."""
+    with _failed_logins_lock:
+        entry = _failed_logins.get(key)
+        return (entry is not None and entry[1] >= LOGIN_ATTEMPT_LIMIT and
+                time.monotonic() - entry[0] < LOGIN_ATTEMPT_WINDOW)
+
+
+def _record_failed_login(key):
+    """Count a failed login for a username and address."""
+    now = time.monotonic()
+    with _failed_logins_lock:
+        entry = _failed_logins.get(key)
+        if entry is None or now - entry[0] >= LOGIN_ATTEMPT_WINDOW:
+            # Forget expired windows now and then so the table stays small
+            if len(_failed_logins) > 10000:
+                for stale in [k for k, v in _failed_logins.items() if now - v[0] >= LOGIN_ATTEMPT_WINDOW]:
+                    del _failed_logins[stale]
+            _failed_logins[key] = (now, 1)
+        else:
+            _failed_logins[key] = (entry[0], entry[1] + 1)
+
+
+# Game process that has already imported the game modules and waits for the
+# arguments of the next launch on its stdin
+_standby_game = None
+_standby_game_lock = threading.Lock()
+
+# Starts standby game processes after the launch request has been answered
+_standby_starter = ThreadPoolExecutor(max_workers=1)
+
+
+def _launch_game_process(game_args):
+    """
+    Start the Pygame game, handing it to the standby game process if there
+    is one, and start a new standby process for the next launch.
+    
+    Args:
+        game_args: Command line arguments for the game
+    """
+    global _standby_game
+    with _standby_game_lock:
+        process, _standby_game = _standby_game, None
+    
+    launched = False
+    if process is not None and process.poll() is None:
+        try:
+            process.stdin.write(json.dumps(game_args).encode('utf-8') + b'\n')
+            process.stdin.close()
+            launched = True
+        except OSError:
+            pass
+    if not launched:
+        subprocess.Popen([sys.executable, RUN_SCRIPT_PATH] + game_args)
+    
+    _standby_starter.submit(_start_standby_game)
+
+
+def _start_standby_game():
+    """Start a standby game process, unless one is already waiting."""
+    global _standby_game
+    try:
+        process = subprocess.Popen([sys.executable, RUN_SCRIPT_PATH, '--standby'],
+                                   stdin=subprocess.PIPE)
+    except OSError as e:
+        logger.warning("Error starting standby game process: %s", e)
+        return
+    
+    with _standby_game_lock:
+        if _standby_game is None:
+            _standby_game = process
+            return
+    # Another launch already started one; closing stdin makes this one exit
+    process.stdin.close()
+
+
+def _missing_field(data, fields):
+    """
+    Find a required field absent from an API request body.
+    
+    Args:
+        data: Decoded JSON body of the request
+        fields: Frozenset of required field names
+        
+    Returns:
+        str: Name of a missing field, or None if all are present
+    """
+    missing = fields - data.keys() if isinstance(data, dict) else fields
+    return min(missing) if missing else None
 
 
-# Store tokens temporarily (in a real app, this would be in a database)
-user_tokens = {}
+def _parse_moves(moves):
+    """
+    Normalize the moves of an API request to a list.
+    
+    Args:
+        moves: List of moves, a JSON-encoded list, or None
+        
+    Returns:
+        list: The moves, or an empty list if none were given
+    """
+    # If moves is already a list, keep it as is
+    if isinstance(moves, list):
+        return moves
+    # If moves is a string that looks like JSON, parse it
+    if isinstance(moves, str) and moves.startswith('['):
+        try:
+            # orjson's decode error subclasses json.JSONDecodeError
+            return orjson.loads(moves) if orjson is not None else json.loads(moves)
+        except json.JSONDecodeError:
+            return moves.split(',')
+    # Otherwise, create an empty list
+    return []
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider for request.json and jsonify backed by orjson."""
+    
+    def dumps(self, obj, **kwargs):
+        # Dates and other types orjson doesn't serialize like Flask go
+        # through Flask's default handler, so responses look the same
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 def create_app(debug=False):
     """
@@ -30,11 +200,22 @@ def create_app(debug=False):
         Flask: Configured Flask application
     """
     app = Flask(__name__)
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-for-chess-app')
     app.config['DEBUG'] = debug
     
+    # Reuse compiled templates across restarts; Flask only re-checks
+    # template files for changes in debug mode
+    try:
+        if JINJA_CACHE_DIR:
+            os.makedirs(JINJA_CACHE_DIR, mode=0o700, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+    except (OSError, RuntimeError) as e:
+        app.logger.warning("Template bytecode cache disabled: %s", e)
+    
     # Initialize MongoDB
     mongo_db.init_app(app)
     
@@ -47,6 +228,28 @@ def create_app(debug=False):
     def load_user(user_id):
         return User.load_user(user_id)
     
+    @app.after_request
+    def compress_response(response):
+        """Gzip HTML and JSON responses for clients that accept it."""
+        if response.direct_passthrough or response.mimetype not in COMPRESS_MIMETYPES:
+            return response
+        # Whether these responses are compressed depends on the request, so
+        # caches must keep the compressed and uncompressed variants apart
+        response.vary.add('Accept-Encoding')
+        
+        # accept_encodings honours q-values, so "gzip;q=0" refuses gzip
+        if (response.status_code != 200 or 'Content-Encoding' in response.headers or
+                not request.accept_encodings['gzip']):
+            return response
+        
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+    
     # Register routes
     
     @app.route('/')
@@ -60,14 +263,25 @@ def create_app(debug=False):
         if current_user.is_authenticated:
             return redirect(url_for('dashboard'))
         
+        # WTForms is only loaded once a page with a form is first requested
+        from chess_app.web.forms import LoginForm
         form = LoginForm()
         if form.validate_on_submit():
+            # Refuse repeated failures before spending time on the password hash
+            login_key = (form.username.data, request.remote_addr)
+            if _login_blocked(login_key):
+                flash('Too many failed login attempts. Please try again later.')
+                return render_template('login.html', form=form)
+            
             user_doc = mongo_db.get_user_by_username(form.username.data)
             if user_doc and mongo_db.check_password(user_doc, form.password.data):
+                with _failed_logins_lock:
+                    _failed_logins.pop(login_key, None)
                 user = User(user_doc)
                 login_user(user, remember=form.remember_me.data)
                 next_page = request.args.get('next')
                 return redirect(next_page or url_for('dashboard'))
+            _record_failed_login(login_key)
             flash('Invalid username or password')
         
         return render_template('login.html', form=form)
@@ -78,16 +292,17 @@ def create_app(debug=False):
         if current_user.is_authenticated:
             return redirect(url_for('dashboard'))
         
+        from chess_app.web.forms import RegistrationForm
         form = RegistrationForm()
+        # The form's validate_username already rejected taken usernames
         if form.validate_on_submit():
-            # Check if username already exists
-            existing_user = mongo_db.get_user_by_username(form.username.data)
-            if existing_user:
+            # Create new user; the unique index catches a username taken
+            # since the form was validated
+            try:
+                user_id = mongo_db.create_user(form.username.data, form.password.data)
+            except DuplicateKeyError:
                 flash('Username already taken.')
                 return render_template('register.html', form=form)
-                
-            # Create new user
-            user_id = mongo_db.create_user(form.username.data, form.password.data)
             flash('Registration successful! You can now log in.')
             return redirect(url_for('login'))
         
@@ -113,20 +328,37 @@ def create_app(debug=False):
             'win_percentage': current_user.get_win_percentage()
         }
         
-        # Get recent games
-        recent_games = mongo_db.get_user_games(current_user.id, limit=5)
-        
-        # Get saved games
-        saved_games = mongo_db.get_user_saved_games(current_user.id)
+        # Get recent games and saved games
+        recent_games, saved_games = mongo_db.get_user_dashboard_games(current_user.id, recent_limit=5)
         
         return render_template('dashboard.html', stats=stats, recent_games=recent_games, saved_games=saved_games)
     
     @app.route('/game_history')
     @login_required
     def game_history():
-        """View game history route."""
-        games = mongo_db.get_user_games(current_user.id)
-        return render_template('game_history.html', games=games)
+        """View game history route, one page of games at a time."""
+        # Pages are keyed by the end time and ID of the last game shown, so
+        # older pages cost the same to fetch as the first one
+        before = None
+        if request.args.get('before') and request.args.get('before_id'):
+            try:
+                before = (datetime.datetime.fromisoformat(request.args['before']),
+                          ObjectId(request.args['before_id']))
+            except (ValueError, InvalidId):
+                pass
+        
+        # Fetch one extra game to find out whether there is another page
+        games = mongo_db.get_user_games(current_user.id, limit=GAME_HISTORY_PAGE_SIZE + 1, before=before)
+        next_before = None
+        next_before_id = None
+        if len(games) > GAME_HISTORY_PAGE_SIZE:
+            games = games[:GAME_HISTORY_PAGE_SIZE]
+            next_before = games[-1]['end_time'].isoformat()
+            next_before_id = str(games[-1]['_id'])
+        
+        return render_template('game_history.html', games=games, next_before=next_before,
+                               next_before_id=next_before_id,
+                               is_first_page=before is None)
     
     @app.route('/game/<game_id>')
     @login_required
@@ -139,15 +371,17 @@ def create_app(debug=False):
             flash('You do not have permission to view this game or it does not exist.')
             return redirect(url_for('game_history'))
         
-        # Parse the moves from JSON if needed
-        moves = game.get('moves', [])
-        if isinstance(moves, str):
-            try:
-                moves = json.loads(moves)
-            except:
-                moves = []
-        
-        return render_template('view_game.html', game=game, moves=moves)
+        # get_game_by_id already returns the moves as a list of UCI strings
+        response = make_response(render_template('view_game.html', game=game, moves=game.get('moves', [])))
+        # Only the browser may keep the page, which includes the signed-in
+        # username, and it must check back every time so the login and
+        # ownership checks above still apply; an unchanged page comes back
+        # as an empty 304. The tag is weak because the gzipped and plain
+        # bodies share it
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.add_etag(weak=True)
+        return response.make_conditional(request)
     
     def authenticate_api_request():
         """Authenticate an API request using the Authorization header.
@@ -162,15 +396,11 @@ def create_app(debug=False):
             return None, jsonify({'error': 'Missing or invalid Authorization header'}), 401
             
         token = auth_header.split(' ')[1]
-        if token not in user_tokens:
-            return None, jsonify({'error': 'Invalid token'}), 401
+        user_id = mongo_db.get_token_user_id(token)
+        if not user_id:
+            return None, jsonify({'error': 'Invalid or expired token'}), 401
             
-        token_data = user_tokens[token]
-        # Check if token is not expired (30 minutes validity)
-        if time.time() - token_data['created_at'] >= 1800:
-            return None, jsonify({'error': 'Token expired'}), 401
-            
-        user_doc = mongo_db.get_user_by_id(token_data['user_id'])
+        user_doc = mongo_db.get_user_by_id(user_id)
         if not user_doc:
             return None, jsonify({'error': 'User not found'}), 404
             
@@ -190,41 +420,25 @@ def create_app(debug=False):
         else:
             user = current_user
         
-        # Print received data for debugging
-        print(f"Received save_game request with data: {request.json}")
+        # Log only the size of the request for debugging, not the whole move list
+        app.logger.debug("Received save_game request of %d bytes", request.content_length or 0)
         
         data = request.json
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
             
-        # Format moves data properly - ensure it's a list that can be JSON serialized
-        if 'moves' in data:
-            # If moves is already a list, keep it as is
-            if isinstance(data['moves'], list):
-                moves_data = data['moves']
-            # If moves is a string that looks like JSON, parse it
-            elif isinstance(data['moves'], str) and data['moves'].startswith('['):
-                try:
-                    moves_data = json.loads(data['moves'])
-                except json.JSONDecodeError:
-                    moves_data = data['moves'].split(',')
-            # Otherwise, create an empty list
-            else:
-                moves_data = []
-        else:
-            moves_data = []
-            
         # Create a simplified form validation instead of using WTForms
         # Check required fields
-        required_fields = ['name', 'fen', 'difficulty']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        missing = _missing_field(data, SAVE_GAME_FIELDS)
+        if missing:
+            return jsonify({'error': f'Missing required field: {missing}'}), 400
                 
         # Validate difficulty
-        if data['difficulty'] not in ['easy', 'medium', 'hard']:
+        if data['difficulty'] not in DIFFICULTY_LEVELS:
             return jsonify({'error': 'Invalid difficulty level'}), 400
+        
+        moves_data = _parse_moves(data.get('moves'))
             
         try:
             # Prepare game data
@@ -244,7 +458,7 @@ def create_app(debug=False):
                 return jsonify({'error': 'Failed to save game state'}), 500
             
         except Exception as e:
-            print(f"Error saving game: {str(e)}")
+            app.logger.error("Error saving game: %s", e)
             return jsonify({'error': f'Database error: {str(e)}'}), 500
     
     @app.route('/load_game')
@@ -290,11 +504,7 @@ def create_app(debug=False):
     def launch_game():
         """Launch the Pygame chess game with the current user's credentials."""
         # Generate a token for the user
-        token = secrets.token_hex(16)
-        user_tokens[token] = {
-            'user_id': current_user.id,
-            'created_at': time.time()
-        }
+        token = mongo_db.create_auth_token(current_user.id)
         
         # Get the difficulty level from the form
         difficulty = request.form.get('difficulty', 'medium')
@@ -312,14 +522,9 @@ def create_app(debug=False):
                     '--saved-game-fen', saved_game['fen']
                 ]
         
-        # Get the main script path
-        script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'run.py')
-        
         try:
             # Launch the game with the user's credentials
-            subprocess.Popen([
-                sys.executable,
-                script_path,
+            _launch_game_process([
                 '--no-web',
                 '--user-id', str(current_user.id),
                 '--token', token,
@@ -344,37 +549,21 @@ def create_app(debug=False):
         else:
             user = current_user
         
-        # Print received data for debugging
-        print(f"Received record_game request with data: {request.json}")
-            
+        # Log only the size of the request for debugging, not the whole move list
+        app.logger.debug("Received record_game request of %d bytes", request.content_length or 0)
+        
         data = request.json
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
-        required_fields = ['result', 'difficulty', 'final_fen']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Format moves data properly
-        if 'moves' in data:
-            # If moves is already a list, keep it as is
-            if isinstance(data['moves'], list):
-                moves_data = data['moves']
-            # If moves is a string that looks like JSON, parse it
-            elif isinstance(data['moves'], str) and data['moves'].startswith('['):
-                try:
-                    moves_data = json.loads(data['moves'])
-                except json.JSONDecodeError:
-                    moves_data = data['moves'].split(',')
-            # Otherwise, create an empty list
-            else:
-                moves_data = []
-        else:
-            moves_data = []
-            
+        missing = _missing_field(data, RECORD_GAME_FIELDS)
+        if missing:
+            return jsonify({'error': f'Missing required field: {missing}'}), 400
+        
+        moves_data = _parse_moves(data.get('moves'))
+        
         try:
             # Convert end_time from string to datetime if present
             end_time = None
@@ -383,7 +572,7 @@ def create_app(debug=False):
                     end_time = datetime.datetime.fromisoformat(data['end_time'])
                 except (ValueError, TypeError):
                     # If conversion fails, use current time
-                    print(f"Error parsing end_time: {data['end_time']}. Using current time.")
+                    app.logger.warning("Error parsing end_time: %s. Using current time.", data['end_time'])
                     end_time = datetime.datetime.now()
             else:
                 end_time = datetime.datetime.now()
@@ -398,15 +587,12 @@ def create_app(debug=False):
                 'start_time': datetime.datetime.now() # Approximate if not provided
             }
             
-            # Save the game record
-            game_id = mongo_db.save_game_record(user.id, game_data)
-            
-            # Update user statistics
-            mongo_db.update_user_stats(user.id, data['result'])
+            # Save the game record and update the user's statistics
+            game_id = mongo_db.record_completed_game(user.id, game_data)
             
             return jsonify({'success': True, 'id': str(game_id)})
         except Exception as e:
-            print(f"Error recording game: {str(e)}")
+            app.logger.error("Error recording game: %s", e)
             return jsonify({'error': f'Database error: {str(e)}'}), 500
     
     @app.route('/api/auth', methods=['POST'])
@@ -417,19 +603,16 @@ def create_app(debug=False):
         if not data or 'token' not in data:
             return jsonify({'error': 'No token provided'}), 400
             
-        token = data['token']
-        
-        if token in user_tokens:
-            token_data = user_tokens[token]
-            # Check if token is not expired (30 minutes validity)
-            if time.time() - token_data['created_at'] < 1800:
-                user_doc = mongo_db.get_user_by_id(token_data['user_id'])
-                if user_doc:
-                    return jsonify({
-                        'success': True, 
-                        'user_id': str(user_doc['_id']), 
-                        'username': user_doc['username']
-                    })
+        user_id = mongo_db.get_token_user_id(data['token'])
+        
+        if user_id:
+            user_doc = mongo_db.get_user_by_id(user_id)
+            if user_doc:
+                return jsonify({
+                    'success': True, 
+                    'user_id': str(user_doc['_id']), 
+                    'username': user_doc['username']
+                })
         
         return jsonify({'error': 'Invalid or expired token'}), 401
     
@@ -439,20 +622,14 @@ def create_app(debug=False):
         # Get top players by win percentage (minimum 5 games)
         top_player_docs = mongo_db.get_top_players(min_games=5, limit=10)
         
-        # Convert to User objects to maintain template compatibility
-        top_players = []
-        for doc in top_player_docs:
-            user_obj = User({
-                "_id": doc["_id"],
-                "username": doc["username"],
-                "games_played": doc["games_played"],
-                "wins": doc["wins"],
-                "losses": doc["losses"],
-                "draws": doc["draws"]
-            })
-            top_players.append(user_obj)
-        
-        return render_template('leaderboard.html', top_players=top_players)
+        # Convert to User objects to maintain template compatibility; the
+        # documents are already projected to the fields User reads
+        top_players = [User(doc) for doc in top_player_docs]
+        
+        response = make_response(render_template('leaderboard.html', top_players=top_players))
+        response.cache_control.private = True
+        response.cache_control.max_age = mongo_db.LEADERBOARD_CACHE_TTL
+        return response
     
     @app.route('/api/delete_saved_game/<game_id>', methods=['DELETE'])
     def delete_saved_game(game_id):
@@ -487,7 +664,7 @@ def create_app(debug=False):
                 return jsonify({'error': 'Failed to delete saved game'}), 500
                 
         except Exception as e:
-            print(f"Error deleting saved game: {str(e)}")
+            app.logger.error("Error deleting saved game: %s", e)
             return jsonify({'error': f'Database error: {str(e)}'}), 500
 
     # Create a test user if none exists (for development)
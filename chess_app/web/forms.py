@@ -3,7 +3,7 @@ Forms for the Flask web application.
 """
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField, FieldList
+from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField
 from wtforms.validators import DataRequired, EqualTo, Length, ValidationError
 from chess_app.db.mongo_db import get_user_by_username
 
@@ -37,6 +37,6 @@ class SaveGameForm(FlaskForm):
     
     name = StringField('Game Name', validators=[DataRequired(), Length(max=64)])
     fen = StringField('FEN', validators=[DataRequired()])
-    moves = FieldList(StringField('Move'))
+    moves = StringField('Moves JSON')
     difficulty = SelectField('Difficulty', choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')])
     submit = SubmitField('Save Game')
\ No newline at end of file
@@ -20,8 +20,8 @@ import logging
 # Add the current directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def parse_args():
-    """Parse command line arguments."""
+def parse_args(argv=None):
+    """Parse command line arguments, or the given argument list."""
     parser = argparse.ArgumentParser(description='Chess Game with AI')
     parser.add_argument('--no-web', action='store_true', help='Disable web server and run standalone game')
     parser.add_argument('--user-id', type=str, help='User ID for the Pygame UI to connect to')
@@ -33,7 +33,24 @@ def parse_args():
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
     parser.add_argument('--mongo-uri', type=str, help='MongoDB connection URI')
     parser.add_argument('--quiet', action='store_true', help='Show minimal server output')
-    return parser.parse_args()
+    parser.add_argument('--standby', action='store_true',
+                        help='Load the game, then wait for its arguments on stdin (used by the web server)')
+    return parser.parse_args(argv)
+
+
+def wait_for_game_args():
+    """
+    Import the game modules, then wait for the web server to send the
+    arguments of a game launch.
+    
+    Returns:
+        argparse.Namespace: Parsed arguments, or None if the server went away
+    """
+    import chess_app.ui.game_window  # noqa: F401
+    line = sys.stdin.readline()
+    if not line:
+        return None
+    return parse_args(json.loads(line))
 
 
 def start_web_server(debug=False, mongo_uri=None):
@@ -102,6 +119,13 @@ def main():
     """Main function to start the application."""
     args = parse_args()
     
+    # A process started ahead of time by the web server, launching its
+    # game without paying for interpreter start-up and imports
+    if args.standby:
+        args = wait_for_game_args()
+        if args is None:
+            return
+    
     # Set MongoDB URI if provided
     mongo_uri = args.mongo_uri
     